@@ -4,9 +4,12 @@ Developed by Mirza Muhammad Mobeen
 """
 
 import streamlit as st
-import pandas as pd
 import os
 
+from catalog import CatalogLibrary
+from grid import data_grid
+from search import TypeAhead, term_label, typeahead_input
+
 # ──────────────────────────────────────────────
 # 1. PAGE CONFIG
 # ──────────────────────────────────────────────
@@ -143,6 +146,14 @@ st.markdown(
         font-weight: 500;
         margin-left: 6px;
     }
+    .related-terms {
+        margin-top: 0.8rem;
+        font-size: 0.78rem;
+        color: #64748B !important;
+    }
+    .suggest-badge {
+        margin: 0 4px 0 0;
+    }
 
     /* ── Card inner grid ── */
     .card-grid {
@@ -254,67 +265,23 @@ st.markdown(
 # ──────────────────────────────────────────────
 DATA_FILE = os.path.join(os.path.dirname(__file__), "Bilingual Automation Action and Activity Catalog.csv")
 
-@st.cache_data
-def load_data() -> pd.DataFrame:
-    """Load and clean the bilingual catalog CSV."""
-    try:
-        df = pd.read_csv(DATA_FILE, encoding="utf-8")
-    except UnicodeDecodeError:
-        # Fallback for Windows-coded files
-        df = pd.read_csv(DATA_FILE, encoding="cp932")
-
-    # Normalize column names
-    # The CSV has: Category (English), Category (Japanese), Activity (English), Activity (Japanese)
-    
-    # 1. Map Category (use English as primary key)
-    if "Category" not in df.columns:
-        if "Category (English)" in df.columns:
-            df["Category"] = df["Category (English)"]
-        elif "Category (Japanese)" in df.columns:
-            df["Category"] = df["Category (Japanese)"]
-    
-    # 2. Ensure Category (Japanese) column is preserved for bilingual display
-    if "Category (Japanese)" not in df.columns:
-        df["Category (Japanese)"] = ""
-    
-    # 3. Ensure Action/Activity columns exist
-    required_cols = [
-        "Category",
-        "Category (Japanese)",
-        "Action (English)",
-        "Action (Japanese)",
-        "Activity (English)",
-        "Activity (Japanese)"
-    ]
-    
-    for col in required_cols:
-        if col not in df.columns:
-            df[col] = ""
-
-    # Drop the Source column — not needed in search UI
-    if "Source" in df.columns:
-        df = df.drop(columns=["Source"])
-        
-    # Remove duplicate rows so each term appears only once
-    df = df.drop_duplicates()
-    
-    # Clean whitespace & fill blanks
-    for col in df.columns:
-        df[col] = df[col].astype(str).str.strip().replace("nan", "")
-        
-    return df
-
-
-df = load_data()
-
-SEARCH_COLS = [
-    "Category",
-    "Category (Japanese)",
-    "Action (English)",
-    "Action (Japanese)",
-    "Activity (English)",
-    "Activity (Japanese)",
-]
+GLOSSARY_DIR = os.path.join(os.path.dirname(__file__), "glossaries")
+
+
+@st.cache_resource
+def get_catalog_library() -> CatalogLibrary:
+    """Primary catalog plus team glossaries; CSV edits are applied incrementally while the app runs."""
+    library = CatalogLibrary(DATA_FILE, GLOSSARY_DIR)
+    library.watch()
+    return library
+
+
+# Pin one complete catalog version for this whole rerun (stack chosen in the sidebar)
+library = get_catalog_library()
+catalog = library.snapshot(st.session_state.get("glossary_stack"))
+df = catalog.df
+facets = catalog.facets
+search_index = catalog.search_index
 
 # ──────────────────────────────────────────────
 # 4. SIDEBAR
@@ -328,25 +295,24 @@ with st.sidebar:
     )
     st.markdown("---")
 
-    # Category filter — build bilingual labels
-    cat_map = {}  # display_label -> english_category
-    for _, row in df[["Category", "Category (Japanese)"]].drop_duplicates().iterrows():
-        en = row["Category"]
-        jp = row["Category (Japanese)"]
-        if jp and jp != en and jp != "":
-            label = f"{en}  ({jp})"
-        else:
-            label = en
-        cat_map[label] = en
-
-    category_labels = sorted(cat_map.keys())
+    if len(library.names) > 1:
+        st.multiselect(
+            "🗂️ Glossaries",
+            options=library.names,
+            default=[library.default],
+            key="glossary_stack",
+            help="Glossaries to search with. Later ones override earlier ones.",
+        )
+
+    # Category filter — bilingual labels precomputed at load
     selected_labels = st.multiselect(
         "📂 Filter by Category",
-        options=category_labels,
+        options=facets.labels,
         default=[],
+        format_func=lambda lbl: f"{lbl} · {facets.count_for_label(lbl)}",
         help="Leave empty to search all categories.",
     )
-    selected_cats = [cat_map[lbl] for lbl in selected_labels]
+    selected_cats = facets.categories_for(selected_labels)
 
     st.markdown("---")
 
@@ -355,14 +321,14 @@ with st.sidebar:
     with col_s1:
         st.markdown(
             f'<div class="sidebar-stat">'
-            f'<div class="stat-num">{len(df)}</div>'
+            f'<div class="stat-num">{facets.total_rows}</div>'
             f'<div class="stat-label">Terms</div></div>',
             unsafe_allow_html=True,
         )
     with col_s2:
         st.markdown(
             f'<div class="sidebar-stat">'
-            f'<div class="stat-num">{df["Category"].nunique()}</div>'
+            f'<div class="stat-num">{facets.n_categories}</div>'
             f'<div class="stat-label">Categories</div></div>',
             unsafe_allow_html=True,
         )
@@ -389,30 +355,30 @@ st.markdown(
 )
 
 # ──────────────────────────────────────────────
-# 6. SEARCH BAR
+# 6. FILTER & SEARCH
 # ──────────────────────────────────────────────
-query = st.text_input(
-    "search_input",
-    placeholder="Search any term (e.g., 'Excel', 'Browser', 'Click')...",
-    label_visibility="collapsed",
-)
+# The type-ahead box reports its value while typing; read it before rendering
+# so its suggestions reflect the current query.
+if "typeahead" not in st.session_state or st.session_state.typeahead.index is not search_index:
+    st.session_state.typeahead = TypeAhead(search_index)
 
-# ──────────────────────────────────────────────
-# 7. FILTER & SEARCH
-# ──────────────────────────────────────────────
-filtered = df.copy()
+query = st.session_state.get("search_input") or ""
+
+# Category filter (bitmap lookup), then text search narrowed from the last query
+mask = facets.mask(selected_cats)
+hits = st.session_state.typeahead.search(query, mask)
 
-# Apply category filter
-if selected_cats:
-    filtered = filtered[filtered["Category"].isin(selected_cats)]
+filtered = df.iloc[hits]
+match_counts = facets.match_counts(hits)
 
-# Apply text search
-if query.strip():
-    q = query.strip().lower()
-    mask = pd.Series(False, index=filtered.index)
-    for col in SEARCH_COLS:
-        mask = mask | filtered[col].str.lower().str.contains(q, na=False)
-    filtered = filtered[mask]
+# ──────────────────────────────────────────────
+# 7. SEARCH BAR
+# ──────────────────────────────────────────────
+typeahead_input(
+    "search_input",
+    placeholder="Search any term (e.g., 'Excel', 'Browser', 'Click')...",
+    suggestions=search_index.suggest(query, hits),
+)
 
 # ──────────────────────────────────────────────
 # 8. VIEW ALL MODE (raw dataframe)
@@ -423,7 +389,7 @@ if view_all:
         f'<span class="results-badge">📋 Showing all {len(filtered)} terms</span>',
         unsafe_allow_html=True,
     )
-    st.dataframe(filtered, use_container_width=True, hide_index=True)
+    data_grid(catalog, hits, key="dict_grid")
 
 # ──────────────────────────────────────────────
 # 9. CARD DISPLAY
@@ -433,7 +399,8 @@ else:
 
     if query.strip() or selected_cats:
         st.markdown(
-            f'<span class="results-badge">🔍 Found {len(filtered)} matching term{"s" if len(filtered) != 1 else ""}</span>',
+            f'<span class="results-badge">🔍 Found {len(filtered)} matching term{"s" if len(filtered) != 1 else ""}'
+            f' in {len(match_counts)} categor{"ies" if len(match_counts) != 1 else "y"}</span>',
             unsafe_allow_html=True,
         )
 
@@ -445,10 +412,19 @@ else:
             "</div>",
             unsafe_allow_html=True,
         )
+        # Closest terms by spelling/character overlap, for typos and variants
+        if query.strip():
+            closest = catalog.similarity.search(query, k=5, mask=mask)
+            if closest:
+                badges = "".join(
+                    f'<span class="cat-badge suggest-badge">{term_label(df.iloc[r])}</span>' for r, _ in closest
+                )
+                st.markdown(f'<div class="related-terms">Did you mean: {badges}</div>', unsafe_allow_html=True)
     else:
         # Render cards
         display_df = filtered.head(100)  # cap for performance
-        for _, row in display_df.iterrows():
+        related = catalog.similarity.related(hits[:100], k=3)
+        for (_, row), similar in zip(display_df.iterrows(), related):
             cat = row.get("Category", "")
             cat_jp = row.get("Category (Japanese)", "")
             en_action = row.get("Action (English)", "")
@@ -462,6 +438,15 @@ else:
             else:
                 cat_display = cat
 
+            if similar:
+                related_html = (
+                    '<div class="related-terms">Related: '
+                    + " / ".join(term_label(df.iloc[r]) for r, _ in similar)
+                    + "</div>"
+                )
+            else:
+                related_html = ""
+
             card_html = f"""
             <div class="term-card">
                 <div class="cat-badge">{cat_display}</div>
@@ -478,6 +463,7 @@ else:
                         <div class="activity-val">{jp_activity}</div>
                     </div>
                 </div>
+                {related_html}
             </div>
             """
             st.markdown(card_html, unsafe_allow_html=True)
@@ -0,0 +1,49 @@
+"""
+Spooled buffers for translated outputs and deferred downloads.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import io
+import shutil
+import tempfile
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Buffers stay in RAM up to this size, then roll over to a temp file on disk
+SPOOL_THRESHOLD = 8 * 1024 * 1024
+
+
+def spooled_buffer():
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD, mode="w+b")
+
+
+def spool_copy(src):
+    """Copies a stream into a spooled buffer in chunks (no full in-memory copy)."""
+    buffer = spooled_buffer()
+    shutil.copyfileobj(src, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def deferred_reader(buffer):
+    """Callable for st.download_button: the output is only read when the user clicks."""
+    def read():
+        buffer.seek(0)
+        return buffer.read()
+    return read
+
+
+def export_file():
+    """
+    Buffered writer over an unnamed temp file. Write the export through it,
+    then `finish_export` hands st.download_button the raw file to read.
+    """
+    return io.BufferedWriter(tempfile.TemporaryFile(buffering=0))
+
+
+def finish_export(writer):
+    """The file behind an `export_file` writer, flushed and rewound (deleted once closed)."""
+    writer.flush()
+    raw = writer.detach()
+    raw.seek(0)
+    return raw
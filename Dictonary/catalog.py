@@ -0,0 +1,542 @@
+"""
+Shared catalog helpers for the Automate Bilingual RPA Dictionary apps.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import itertools
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from search import SearchIndex, SimilarityIndex
+from segments import normalize_text
+
+REQUIRED_COLS = [
+    "Category", "Category (Japanese)",
+    "Action (English)", "Action (Japanese)",
+    "Activity (English)", "Activity (Japanese)",
+]
+
+# Columns that identify a catalog row across edits; the rest are its values
+KEY_COLS = ["Category", "Action (English)", "Activity (English)"]
+
+# Snapshot versions are unique process-wide, so they can key caches directly
+_versions = itertools.count(1)
+
+
+# ──────────────────────────────────────────────
+# LOADING
+# ──────────────────────────────────────────────
+def read_catalog(path) -> pd.DataFrame:
+    """Loads and cleans the bilingual catalog CSV (empty frame if the file is missing)."""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=REQUIRED_COLS)
+
+    try:
+        df = pd.read_csv(path, encoding="utf-8")
+    except UnicodeDecodeError:
+        # Fallback for Windows-coded files
+        df = pd.read_csv(path, encoding="cp932")
+
+    # The CSV has: Category (English), Category (Japanese), Activity (English), Activity (Japanese)
+    if "Category" not in df.columns:
+        if "Category (English)" in df.columns:
+            df["Category"] = df["Category (English)"]
+        elif "Category (Japanese)" in df.columns:
+            df["Category"] = df["Category (Japanese)"]
+
+    for col in REQUIRED_COLS:
+        if col not in df.columns:
+            df[col] = ""
+
+    # Drop the Source column — not needed in search UI
+    if "Source" in df.columns:
+        df = df.drop(columns=["Source"])
+
+    # Clean whitespace & fill blanks
+    for col in df.columns:
+        df[col] = df[col].fillna("").astype(str).str.strip().replace("nan", "")
+
+    # Remove duplicate rows so each term appears only once
+    return df.drop_duplicates().reset_index(drop=True)
+
+
+def row_keys(df: pd.DataFrame) -> list:
+    """Stable identity per row: the KEY_COLS values plus an occurrence number for repeats."""
+    seen = {}
+    keys = []
+    for key in zip(*(df[c] for c in KEY_COLS)):
+        n = seen.get(key, 0)
+        seen[key] = n + 1
+        keys.append(key + (n,))
+    return keys
+
+
+class CatalogDiff:
+    """Row keys added, removed and changed between two catalog versions."""
+
+    def __init__(self, added, removed, changed):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return f"CatalogDiff(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+
+def diff_catalogs(old_df, new_df, old_keys=None, new_keys=None) -> CatalogDiff:
+    old_keys = old_keys if old_keys is not None else row_keys(old_df)
+    new_keys = new_keys if new_keys is not None else row_keys(new_df)
+    cols = [c for c in new_df.columns if c in old_df.columns]
+    old_rows = dict(zip(old_keys, zip(*(old_df[c] for c in cols))))
+    new_rows = dict(zip(new_keys, zip(*(new_df[c] for c in cols))))
+
+    added = [k for k in new_keys if k not in old_rows]
+    removed = [k for k in old_keys if k not in new_rows]
+    changed = [k for k in new_keys if k in old_rows and old_rows[k] != new_rows[k]]
+    if list(old_df.columns) != list(new_df.columns):
+        # A schema change touches every row
+        changed = [k for k in new_keys if k in old_rows]
+    return CatalogDiff(added, removed, changed)
+
+
+# ──────────────────────────────────────────────
+# CATEGORY FACETS
+# ──────────────────────────────────────────────
+class CategoryFacets:
+    """
+    Category labels, counts and row bitmaps, computed once per catalog load.
+    Filtering by category and counting matches become plain array operations.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        codes, categories = pd.factorize(df["Category"], sort=True)
+        self.codes = codes.astype(np.int32)
+        self.categories = list(categories)
+        self.total_rows = len(df)
+
+        # Bilingual sidebar labels -> English category
+        self.label_to_category = {}
+        pairs = df[["Category", "Category (Japanese)"]].drop_duplicates()
+        for en, jp in zip(pairs["Category"], pairs["Category (Japanese)"]):
+            label = f"{en} ({jp})" if jp and jp != en else en
+            self.label_to_category[label] = en
+        self.labels = sorted(self.label_to_category)
+
+        self._code_of = {cat: i for i, cat in enumerate(self.categories)}
+        self.counts = dict(zip(self.categories, np.bincount(self.codes, minlength=len(self.categories)).tolist()))
+
+        # One packed bitmap row per category
+        onehot = self.codes[None, :] == np.arange(len(self.categories), dtype=np.int32)[:, None]
+        self._bitmaps = np.packbits(onehot, axis=1)
+
+    @property
+    def n_categories(self) -> int:
+        return len(self.categories)
+
+    def categories_for(self, labels) -> list:
+        """Maps selected sidebar labels back to English categories."""
+        return list(dict.fromkeys(self.label_to_category[lbl] for lbl in labels))
+
+    def count_for_label(self, label) -> int:
+        return self.counts.get(self.label_to_category.get(label), 0)
+
+    def mask(self, categories) -> np.ndarray:
+        """Boolean row mask for the given categories (all rows if none are given)."""
+        if not categories:
+            return np.ones(self.total_rows, dtype=bool)
+        rows = [self._code_of[c] for c in categories if c in self._code_of]
+        if not rows:
+            return np.zeros(self.total_rows, dtype=bool)
+        merged = np.bitwise_or.reduce(self._bitmaps[rows], axis=0)
+        return np.unpackbits(merged, count=self.total_rows).astype(bool)
+
+    def match_counts(self, rows: np.ndarray) -> dict:
+        """Per-category counts of the selected rows (boolean mask or positions), non-zero only."""
+        counts = np.bincount(self.codes[rows], minlength=len(self.categories))
+        return {self.categories[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+
+# ──────────────────────────────────────────────
+# GLOSSARY MAPS
+# ──────────────────────────────────────────────
+# Glossary layer of each row in a merged catalog (higher overrides lower)
+LAYER_COL = "_layer"
+
+# direction -> [(source column, target column, lowercase keys)]
+GLOSSARY_PAIRS = {
+    "En_to_Jp": [("Action (English)", "Action (Japanese)", True), ("Activity (English)", "Activity (Japanese)", True)],
+    "Jp_to_En": [("Action (Japanese)", "Action (English)", False), ("Activity (Japanese)", "Activity (English)", False)],
+}
+
+
+def _glossary_map(df, direction, only=None) -> dict:
+    """
+    Term map for one direction; `only` restricts it to the given source keys.
+    Rows without a target are ignored. In a merged catalog each key comes from
+    the highest LAYER_COL that defines it. When that layer's rows disagree, the
+    target most of them give wins; keys without a majority ("close" -> 閉じる or
+    ブラウザを閉じる) are left out, so the backend translates them in context.
+    """
+    layers = df[LAYER_COL] if LAYER_COL in df else pd.Series(0, index=df.index)
+    votes = {}
+    for src_col, tgt_col, lower in GLOSSARY_PAIRS[direction]:
+        src = df[src_col].fillna("").astype(str)
+        src = src.str.lower() if lower else src
+        tgt = df[tgt_col].fillna("").astype(str).str.strip()
+        rows = (src.isin(only) if only is not None else src != "") & (tgt != "")
+        for key, val, layer in zip(src[rows], tgt[rows], layers[rows]):
+            if not key:
+                continue
+            top, counts = votes.get(key, (layer, None))
+            if counts is None or layer > top:
+                top, counts = layer, Counter()
+                votes[key] = (top, counts)
+            if layer == top:
+                counts[val] += 1
+    out = {}
+    for key, (_, counts) in votes.items():
+        (val, n), *runner_up = counts.most_common(2)
+        if not runner_up or runner_up[0][1] < n:
+            out[key] = val
+    return out
+
+
+def _glossary_keys(df, direction) -> set:
+    keys = set()
+    for src_col, _, lower in GLOSSARY_PAIRS[direction]:
+        keys.update(df[src_col].str.lower() if lower else df[src_col])
+    keys.discard("")
+    return keys
+
+
+# List separators allowed between glossary terms in a locally resolved segment
+_TERM_SEP = re.compile(r"(\s*(?:[/|,;、，；・+&\n]|\s[-–—>→]\s)\s*)")
+_SEP_PUNCT = {
+    "En_to_Jp": str.maketrans({",": "、", ";": "；"}),
+    "Jp_to_En": str.maketrans({"、": ", ", "，": ", ", "；": "; ", "・": " / "}),
+}
+
+
+def _term_key(text: str, direction: str) -> str:
+    key = normalize_text(text)
+    return key.lower() if direction == "En_to_Jp" else key
+
+
+class Glossary:
+    """Dictionary term lookups per translation direction, built once per catalog version."""
+
+    def __init__(self, maps: dict):
+        self.maps = maps
+        self._normalized = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Glossary":
+        return cls({d: _glossary_map(df, d) for d in GLOSSARY_PAIRS})
+
+    def lookup_map(self, direction) -> dict:
+        return self.maps[direction]
+
+    def term(self, text: str, direction: str):
+        """Target term for an exact or width/whitespace-normalized glossary hit, else None."""
+        exact = self.maps[direction].get(text.lower() if direction == "En_to_Jp" else text)
+        if exact is not None:
+            return exact
+        if direction not in self._normalized:
+            normalized = {}
+            for k, v in self.maps[direction].items():
+                key = _term_key(k, direction)
+                # Terms that only differ in width/spacing but disagree resolve to nothing
+                normalized[key] = v if normalized.get(key, v) == v else None
+            self._normalized[direction] = normalized
+        return self._normalized[direction].get(_term_key(text, direction))
+
+    def resolve(self, text: str, direction: str):
+        """
+        Local translation of a segment that is a glossary term, or a list of
+        terms joined by separators ("Open File / Close File"). None otherwise.
+        """
+        text = text.strip()
+        if not text:
+            return None
+        whole = self.term(text, direction)
+        if whole is not None:
+            return whole
+        parts = _TERM_SEP.split(text)
+        if len(parts) == 1:
+            return None
+        out = []
+        for i, part in enumerate(parts):
+            if i % 2:
+                sep = part.translate(_SEP_PUNCT[direction])
+                # Japanese list punctuation takes no surrounding spaces
+                out.append(sep.strip() if sep.strip() in ("、", "；") else sep)
+                continue
+            hit = self.term(part, direction) if part else None
+            if hit is None:
+                return None
+            out.append(hit)
+        return "".join(out)
+
+    def updated(self, new_df, touched_old, touched_new) -> "Glossary":
+        """
+        Copy with only the terms of touched rows recomputed. `touched_old` are the
+        removed/changed rows of the previous catalog, `touched_new` the added/changed
+        rows of the new one.
+        """
+        maps = {}
+        for direction, old_map in self.maps.items():
+            affected = _glossary_keys(touched_old, direction) | _glossary_keys(touched_new, direction)
+            new_map = dict(old_map)
+            for key in affected:
+                new_map.pop(key, None)
+            new_map.update(_glossary_map(new_df, direction, only=affected))
+            maps[direction] = new_map
+        return Glossary(maps)
+
+
+def as_glossary(glossary) -> Glossary:
+    """Accepts a Glossary or a catalog DataFrame."""
+    return glossary if isinstance(glossary, Glossary) else Glossary.from_frame(glossary)
+
+
+# ──────────────────────────────────────────────
+# HOT-RELOADABLE CATALOG
+# ──────────────────────────────────────────────
+class CatalogSnapshot:
+    """
+    One immutable catalog version with its derived lookups. Readers hold a
+    reference for a whole rerun, so a reload never shows them a partial state.
+    """
+
+    def __init__(self, version, df, keys, facets, search_index, glossary, similarity):
+        self.version = version
+        self.df = df
+        self.keys = keys
+        self.facets = facets
+        self.search_index = search_index
+        self.glossary = glossary
+        self.similarity = similarity
+        self._sort_orders = {}
+        self._sort_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, df) -> "CatalogSnapshot":
+        # Term lookups need the glossary layers of a merged catalog; nothing else sees them
+        glossary = Glossary.from_frame(df)
+        df = df.drop(columns=LAYER_COL, errors="ignore")
+        return cls(next(_versions), df, row_keys(df), CategoryFacets(df), SearchIndex(df), glossary, SimilarityIndex(df))
+
+    def applied(self, new_df, new_keys, diff: CatalogDiff) -> "CatalogSnapshot":
+        """
+        Next version with `diff` applied. Surviving rows keep their order, added
+        rows go to the end; only touched rows are re-indexed.
+        """
+        new_pos = {k: i for i, k in enumerate(new_keys)}
+        old_pos = {k: i for i, k in enumerate(self.keys)}
+        changed = set(diff.changed)
+
+        keys = [k for k in self.keys if k in new_pos] + diff.added
+        df = new_df.iloc[[new_pos[k] for k in keys]].reset_index(drop=True)
+        reuse = [old_pos[k] if k in old_pos and k not in changed else None for k in keys]
+
+        touched_old = self.df.iloc[[old_pos[k] for k in diff.removed + diff.changed]]
+        touched_new = new_df.iloc[[new_pos[k] for k in diff.added + diff.changed]]
+
+        return CatalogSnapshot(
+            next(_versions),
+            df,
+            keys,
+            CategoryFacets(df),
+            self.search_index.updated(df, reuse),
+            self.glossary.updated(df, touched_old, touched_new),
+            self.similarity.updated(df, reuse),
+        )
+
+    def sort_order(self, column: str) -> np.ndarray:
+        """All row positions ordered by `column` (case-insensitive), computed once per snapshot."""
+        with self._sort_lock:
+            order = self._sort_orders.get(column)
+            if order is None:
+                values = self.df[column].fillna("").astype(str).str.casefold().to_numpy()
+                order = self._sort_orders[column] = np.argsort(values, kind="stable")
+        return order
+
+    def sorted_rows(self, rows, column: str, descending: bool = False) -> np.ndarray:
+        """
+        `rows` (positions) in `column` order. Filters the precomputed order
+        instead of sorting the subset, so it's one linear pass.
+        """
+        order = self.sort_order(column)
+        selected = np.zeros(len(self.df), dtype=bool)
+        selected[rows] = True
+        order = order[selected[order]]
+        return order[::-1] if descending else order
+
+
+class CatalogStore:
+    """
+    Owns the current CatalogSnapshot for a CSV file. Changes on disk are picked up
+    by polling (on access and, optionally, from a watcher thread), diffed against
+    the loaded version and applied incrementally.
+    """
+
+    def __init__(self, path, poll_interval=2.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.last_diff = None
+        self._lock = threading.Lock()
+        self._stamp = self._file_stamp()
+        self._last_check = time.monotonic()
+        self._snapshot = CatalogSnapshot.build(read_catalog(path))
+        self._watcher = None
+
+    def _file_stamp(self):
+        try:
+            st_ = os.stat(self.path)
+        except OSError:
+            return None
+        return (st_.st_mtime_ns, st_.st_size)
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def current(self) -> CatalogSnapshot:
+        """The latest complete snapshot, reloading first if the file changed."""
+        if time.monotonic() - self._last_check >= self.poll_interval:
+            self.refresh()
+        return self._snapshot
+
+    def refresh(self) -> bool:
+        """Re-reads the CSV if it changed on disk. Returns True when a new version was published."""
+        with self._lock:
+            self._last_check = time.monotonic()
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._stamp:
+                return False
+
+            try:
+                new_df = read_catalog(self.path)
+            except Exception:
+                # Most likely caught mid-save; try again on the next poll
+                return False
+            if self._file_stamp() != stamp:
+                return False
+
+            self._stamp = stamp
+            old = self._snapshot
+            new_keys = row_keys(new_df)
+            diff = diff_catalogs(old.df, new_df, old.keys, new_keys)
+            if not diff:
+                return False
+
+            # Build the whole next version first, then publish it with one assignment
+            self._snapshot = old.applied(new_df, new_keys, diff)
+            self.last_diff = diff
+            return True
+
+    def watch(self):
+        """Starts a daemon thread that polls the file every `poll_interval` seconds."""
+        if self._watcher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.poll_interval)
+                self.refresh()
+
+        self._watcher = threading.Thread(target=loop, name="catalog-watcher", daemon=True)
+        self._watcher.start()
+
+
+# ──────────────────────────────────────────────
+# MULTIPLE GLOSSARIES
+# ──────────────────────────────────────────────
+def merge_catalogs(frames) -> pd.DataFrame:
+    """
+    Stacks several cleaned catalogs. For rows with the same KEY_COLS, the later
+    frame wins. The result keeps each row's frame index in LAYER_COL, so term
+    lookups built from it (CatalogSnapshot.build) also let later glossaries
+    override earlier ones, term by term.
+    """
+    frames = [f.assign(**{LAYER_COL: i}) for i, f in enumerate(frames)]
+    merged = pd.concat(frames, ignore_index=True).fillna("")
+    top = merged.groupby(KEY_COLS, sort=False)[LAYER_COL].transform("max")
+    merged = merged[merged[LAYER_COL] == top]
+    return merged.reset_index(drop=True)
+
+
+class CatalogLibrary:
+    """
+    The primary catalog plus any team/product glossaries found in a directory.
+    Merged snapshots are cached per (stack, versions), so switching back to a
+    combination that was already used is free.
+    """
+
+    def __init__(self, primary_path, glossary_dir=None, poll_interval=2.0, max_cached=16):
+        self.glossary_dir = glossary_dir
+        self.poll_interval = poll_interval
+        self.max_cached = max_cached
+        self.default = os.path.splitext(os.path.basename(primary_path))[0]
+        self._stores = {self.default: CatalogStore(primary_path, poll_interval)}
+        self._merged = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._discover()
+
+    def _discover(self):
+        if not self.glossary_dir or not os.path.isdir(self.glossary_dir):
+            return
+        for fname in sorted(os.listdir(self.glossary_dir)):
+            name, ext = os.path.splitext(fname)
+            if ext.lower() == ".csv" and name not in self._stores:
+                self._stores[name] = CatalogStore(os.path.join(self.glossary_dir, fname), self.poll_interval)
+
+    @property
+    def names(self) -> list:
+        return list(self._stores)
+
+    def snapshot(self, stack=None) -> CatalogSnapshot:
+        """Merged snapshot for the selected glossaries (later entries take precedence)."""
+        stack = [n for n in (stack or []) if n in self._stores] or [self.default]
+        parts = [self._stores[n].current() for n in stack]
+        if len(parts) == 1:
+            return parts[0]
+
+        key = tuple((n, p.version) for n, p in zip(stack, parts))
+        with self._lock:
+            cached = self._merged.pop(key, None)
+            if cached is None:
+                cached = CatalogSnapshot.build(merge_catalogs([p.df for p in parts]))
+                if len(self._merged) >= self.max_cached:
+                    self._merged.pop(next(iter(self._merged)))
+            # Most recently used combinations stay at the end
+            self._merged[key] = cached
+            return cached
+
+    def refresh(self):
+        self._discover()
+        for store in list(self._stores.values()):
+            store.refresh()
+
+    def watch(self):
+        """Starts one daemon thread that polls every glossary file (and the directory)."""
+        if self._watcher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.poll_interval)
+                self.refresh()
+
+        self._watcher = threading.Thread(target=loop, name="catalog-library-watcher", daemon=True)
+        self._watcher.start()
@@ -0,0 +1,243 @@
+"""
+Glossary consistency check: did the official terms survive translation?
+Developed by Mirza Muhammad Mobeen
+"""
+
+import weakref
+from collections import Counter, deque
+
+from segments import QUOTED_TERM, detect_direction, normalize_text, split_affixes, split_sentences
+
+
+# ──────────────────────────────────────────────
+# MULTI-PATTERN MATCHER (AHO-CORASICK)
+# ──────────────────────────────────────────────
+def _is_word(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+class TermMatcher:
+    """
+    Finds all glossary terms in one linear pass over the text. Overlapping
+    hits are resolved leftmost-longest, and Latin terms must sit on word
+    boundaries ("open" doesn't match inside "reopen").
+    """
+
+    def __init__(self, terms, fold_case=False):
+        self.fold_case = fold_case
+        self.terms = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for term in dict.fromkeys(terms):
+            key = normalize_text(term)
+            if fold_case:
+                key = key.lower()
+            if not key:
+                continue
+            node = 0
+            for ch in key:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(len(self.terms))
+            self.terms.append(term)
+        keys = [normalize_text(t) for t in self.terms]
+        self._lengths = [len(k) for k in keys]
+        self._bounded = [(_is_word(k[0]), _is_word(k[-1])) for k in keys]
+
+        # Breadth-first failure links; each node also reports its suffixes' terms
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def find(self, text: str) -> list:
+        """Terms found in `text`, in order of appearance (non-overlapping)."""
+        text = normalize_text(text)
+        if self.fold_case:
+            text = text.lower()
+        best = {}  # start -> (length, term index)
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for tid in out[node]:
+                start = i - self._lengths[tid] + 1
+                left, right = self._bounded[tid]
+                if left and start > 0 and _is_word(text[start - 1]):
+                    continue
+                if right and i + 1 < len(text) and _is_word(text[i + 1]):
+                    continue
+                if self._lengths[tid] > best.get(start, (0, 0))[0]:
+                    best[start] = (self._lengths[tid], tid)
+
+        found = []
+        pos = 0
+        while pos < len(text):
+            if pos in best:
+                length, tid = best[pos]
+                found.append(self.terms[tid])
+                pos += length
+            else:
+                pos += 1
+        return found
+
+
+class TermChecker:
+    """Source-term and official-rendering matchers for one direction of a glossary."""
+
+    def __init__(self, term_map: dict, direction: str):
+        self.direction = direction
+        self.term_map = term_map
+        self.source = TermMatcher(term_map, fold_case=direction == "En_to_Jp")
+        self.target = TermMatcher(term_map.values(), fold_case=direction == "Jp_to_En")
+
+
+_checkers = weakref.WeakKeyDictionary()
+
+
+def term_checker(glossary, direction: str) -> TermChecker:
+    """Checker for a Glossary, built once per catalog version and direction."""
+    per_glossary = _checkers.setdefault(glossary, {})
+    if direction not in per_glossary:
+        per_glossary[direction] = TermChecker(glossary.lookup_map(direction), direction)
+    return per_glossary[direction]
+
+
+# ──────────────────────────────────────────────
+# CONSISTENCY REPORT
+# ──────────────────────────────────────────────
+class ConsistencyReport:
+    """Glossary-term coverage of one translated document."""
+
+    def __init__(self):
+        self.expected = 0         # source-term occurrences
+        self.found = 0            # ...whose official rendering is in the translation
+        self.misses = []          # (term, official term, source text, translated text)
+        self.per_term = {}        # term -> [rendered officially, missed]
+
+    @property
+    def coverage(self) -> float:
+        return self.found / self.expected if self.expected else 1.0
+
+    @property
+    def inconsistent(self) -> list:
+        """Terms rendered officially in some places but not in others."""
+        return sorted(t for t, (ok, missed) in self.per_term.items() if ok and missed)
+
+    def add(self, term, official, ok, source_text, target_text):
+        self.expected += 1
+        counts = self.per_term.setdefault(term, [0, 0])
+        if ok:
+            self.found += 1
+            counts[0] += 1
+        else:
+            counts[1] += 1
+            self.misses.append((term, official, source_text, target_text))
+
+    def merge(self, other: "ConsistencyReport"):
+        """Adds another document's results (batch totals)."""
+        self.expected += other.expected
+        self.found += other.found
+        self.misses += other.misses
+        for term, (ok, missed) in other.per_term.items():
+            counts = self.per_term.setdefault(term, [0, 0])
+            counts[0] += ok
+            counts[1] += missed
+
+    def summary(self) -> str:
+        if not self.expected:
+            return "No checked glossary terms in the source"
+        text = f"Glossary coverage {self.coverage:.0%} ({self.found}/{self.expected} pinned or multi-word terms)"
+        if self.inconsistent:
+            text += f" · {len(self.inconsistent)} rendered inconsistently"
+        return text
+
+
+# Japanese source terms at least this long count as compound terms in running text
+COMPOUND_TERM_CHARS = 4
+
+
+def _is_compound(term: str, direction: str) -> bool:
+    """Multi-word terms ("close file", ファイルを閉じる) are specific enough to check anywhere."""
+    return " " in term if direction == "En_to_Jp" else len(term) >= COMPOUND_TERM_CHARS
+
+
+def checked_terms(text: str, glossary, checker: TermChecker) -> list:
+    """
+    Glossary terms in `text` whose official rendering should appear in the
+    translation: every term of sentences made only of terms (resolved
+    locally), quoted terms, and multi-word terms anywhere. Single common words
+    in running text ("open", "file") are left to the backend, so they aren't checked.
+    """
+    terms = []
+    for sentence in split_sentences(text):
+        core = normalize_text(split_affixes(sentence)[1])
+        if not core:
+            continue
+        found = checker.source.find(core)
+        if glossary.resolve(core, checker.direction):
+            terms += found
+            continue
+        quoted = []
+        for match in QUOTED_TERM.finditer(core):
+            term = next(group for group in match.groups() if group)
+            key = term.lower() if checker.direction == "En_to_Jp" else term
+            if key in checker.term_map:
+                quoted.append(key)
+        # Compound terms that aren't already counted as quoted
+        remaining = Counter(quoted)
+        for term in found:
+            key = term.lower() if checker.direction == "En_to_Jp" else term
+            if remaining[key]:
+                remaining[key] -= 1
+            elif _is_compound(key, checker.direction):
+                terms.append(key)
+        terms += quoted
+    return terms
+
+
+def check_pairs(pairs, glossary, direction) -> ConsistencyReport:
+    """
+    Checks (source text, translated text) pairs: every glossary term picked
+    by checked_terms in a source text should appear as its official
+    rendering in the matching translation. With direction "Auto" each pair
+    uses its detected direction.
+    """
+    report = ConsistencyReport()
+    for source_text, target_text in pairs:
+        if not isinstance(source_text, str) or not source_text.strip():
+            continue
+        pair_direction = direction if direction in ("En_to_Jp", "Jp_to_En") else detect_direction(source_text)
+        if pair_direction is None:
+            continue
+        checker = term_checker(glossary, pair_direction)
+        terms = checked_terms(source_text, glossary, checker)
+        if not terms:
+            continue
+        rendered = Counter(checker.target.find(target_text if isinstance(target_text, str) else ""))
+        for term in terms:
+            official = checker.term_map[term]
+            ok = rendered[official] > 0
+            if ok:
+                rendered[official] -= 1
+            report.add(term, official, ok, source_text, target_text)
+    return report
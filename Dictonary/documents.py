@@ -0,0 +1,814 @@
+"""
+Document translation (DOCX, PDF, XLSX, XLS, CSV) with percentage progress.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import bisect
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait
+from difflib import SequenceMatcher
+from functools import partial
+
+import pandas as pd
+
+from buffers import XLSX_MIME, spool_copy, spooled_buffer
+from catalog import as_glossary
+from consistency import check_pairs
+from loader import lazy_import
+from memory import MemoryPeek, TranslationMemory, aligned_entries
+from scheduler import MAX_BACKEND_CALLS, run_in_context
+from segments import SKIP_RULES, normalize_text
+from translator import TEXT_WORKERS, JobReport, translate_segment
+
+
+# ──────────────────────────────────────────────
+# MEMORY
+# ──────────────────────────────────────────────
+# Seconds between resident-memory samples while any job is metered
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def current_rss():
+    """Resident memory of this process in bytes, or None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemoryMeter:
+    """
+    Peak resident memory of the process while a job runs, above the level at its
+    start. One shared thread samples RSS, so nothing is hooked into the allocator;
+    concurrent jobs see each other's memory and very short spikes can be missed.
+    """
+
+    _meters = set()
+    _sampler = None
+    _lock = threading.Lock()
+
+    def __enter__(self):
+        cls = MemoryMeter
+        self.baseline = self.high = current_rss()
+        self.peak = 0
+        if self.baseline is None:
+            return self
+        with cls._lock:
+            cls._meters.add(self)
+            if cls._sampler is None:
+                cls._sampler = threading.Thread(target=cls._sample_loop, name="memory-meter", daemon=True)
+                cls._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        cls = MemoryMeter
+        if self.baseline is None:
+            return False
+        rss = current_rss() or 0
+        with cls._lock:
+            cls._meters.discard(self)
+            self.high = max(self.high, rss)
+        self.peak = max(self.high - self.baseline, 0)
+        return False
+
+    @classmethod
+    def _sample_loop(cls):
+        while True:
+            time.sleep(RSS_SAMPLE_INTERVAL)
+            rss = current_rss() or 0
+            with cls._lock:
+                if not cls._meters:
+                    cls._sampler = None
+                    return
+                for meter in cls._meters:
+                    meter.high = max(meter.high, rss)
+
+
+# ──────────────────────────────────────────────
+# TRANSLATABLE UNITS
+# ──────────────────────────────────────────────
+# A unit is (key, text, setter): one paragraph, table cell or sheet cell. Keys
+# are positional, so a source file and its translation produce matching keys.
+def docx_units(doc) -> list:
+    units = []
+    for i, para in enumerate(doc.paragraphs):
+        units.append((("p", i), para.text, lambda text, para=para: setattr(para, "text", text)))
+
+    for t, table in enumerate(doc.tables):
+        for r, row in enumerate(table.rows):
+            for c, cell in enumerate(row.cells):
+                # We iterate paragraphs inside cells
+                full_text = ""
+                for p in cell.paragraphs:
+                    full_text += p.text + "\n"
+                # Simple approach: translate combined text and replace the cell content
+                units.append((("t", t, r, c), full_text.strip(), lambda text, cell=cell: setattr(cell, "text", text)))
+    return units
+
+
+def xlsx_units(wb) -> list:
+    units = []
+    for s, sheet in enumerate(wb.worksheets):
+        for row in sheet.iter_rows():
+            for cell in row:
+                if isinstance(cell.value, str) and cell.value.strip():
+                    units.append(((s, cell.coordinate), cell.value, lambda text, cell=cell: setattr(cell, "value", text)))
+    return units
+
+
+def frame_units(frames: dict) -> list:
+    """Header and string cells of {sheet name: DataFrame} (read-only: no setters)."""
+    units = []
+    for s, df_sheet in enumerate(frames.values()):
+        for c, col in enumerate(df_sheet.columns):
+            units.append(((s, "h", c), str(col), None))
+        for c, col in enumerate(df_sheet.columns):
+            for r, val in enumerate(df_sheet[col]):
+                if isinstance(val, str):
+                    units.append(((s, r, c), val, None))
+    return units
+
+
+def read_units(input_file, file_ext) -> list:
+    """Units of a file in traversal order (used for previous source/translation pairs)."""
+    if file_ext == "docx":
+        return docx_units(lazy_import("docx").Document(input_file))
+    if file_ext == "xlsx":
+        return xlsx_units(lazy_import("openpyxl").load_workbook(input_file))
+    if file_ext == "xls":
+        return frame_units(pd.read_excel(input_file, sheet_name=None))
+    if file_ext == "csv":
+        return frame_units({"csv": pd.read_csv(input_file)})
+    raise ValueError(f"Update mode is not supported for .{file_ext} files")
+
+
+# ──────────────────────────────────────────────
+# INCREMENTAL UPDATE (PREVIOUS VERSION)
+# ──────────────────────────────────────────────
+class PreviousTranslation:
+    """
+    A previous source file and its (possibly hand-edited) translation. New
+    units are aligned against the old source by content and position; aligned
+    units reuse the old translation instead of being re-translated.
+    """
+
+    def __init__(self, source_units, translated_units):
+        translated = {key: text for key, text, _ in translated_units}
+        # Only units present in both files can be paired
+        pairs = [(key, text, translated[key]) for key, text, _ in source_units if key in translated and text.strip()]
+        self.unit_keys = [key for key, _, _ in pairs]
+        self.source_keys = [normalize_text(text) for _, text, _ in pairs]
+        self.translations = [tgt for _, _, tgt in pairs]
+
+        # Content fallback: first translation seen for each source text
+        self.by_text = {}
+        for src, tgt in zip(self.source_keys, self.translations):
+            self.by_text.setdefault(src, tgt)
+
+    @classmethod
+    def from_files(cls, file_ext, source_file, translated_file) -> "PreviousTranslation":
+        return cls(read_units(source_file, file_ext), read_units(translated_file, file_ext))
+
+    def __len__(self):
+        return len(self.translations)
+
+    def align(self, units) -> dict:
+        """
+        Maps keys of new units to reusable translations. Units are paired by
+        unit key and content first, then by content that occurs once in each
+        file; the in-order pairs among those are anchors, and only the
+        unmatched stretches between two anchors are aligned as sequences.
+        """
+        old, new = self.source_keys, [normalize_text(text) for _, text, _ in units]
+        matched = {}  # new index -> old index
+
+        # Same unit, same content
+        by_unit = {(key, text): i for i, (key, text) in enumerate(zip(self.unit_keys, old))}
+        for j, ((key, _, _), text) in enumerate(zip(units, new)):
+            i = by_unit.get((key, text))
+            if i is not None:
+                matched[j] = i
+
+        # Content found exactly once among the rest of both files
+        taken = set(matched.values())
+        old_once = _unique_positions((i, text) for i, text in enumerate(old) if i not in taken)
+        new_once = _unique_positions((j, text) for j, text in enumerate(new) if j not in matched)
+        for text, j in new_once.items():
+            if text in old_once:
+                matched[j] = old_once[text]
+
+        # Sequence alignment only between consecutive in-order anchors
+        anchors = _increasing_pairs(sorted(matched.items()))
+        bounds = [(-1, -1)] + [(i, j) for j, i in anchors] + [(len(old), len(new))]
+        for (i0, j0), (i1, j1) in zip(bounds, bounds[1:]):
+            if i1 - i0 > 1 and j1 - j0 > 1:
+                matcher = SequenceMatcher(None, old[i0 + 1:i1], new[j0 + 1:j1], autojunk=False)
+                for tag, a1, a2, b1, b2 in matcher.get_opcodes():
+                    if tag == "equal":
+                        for d in range(a2 - a1):
+                            matched.setdefault(j0 + 1 + b1 + d, i0 + 1 + a1 + d)
+
+        reuse = {units[j][0]: self.translations[i] for j, i in matched.items()}
+        # Moved or repeated text that the alignment didn't pair
+        for (key, _, _), text in zip(units, new):
+            if key not in reuse and text in self.by_text:
+                reuse[key] = self.by_text[text]
+        return reuse
+
+    def lookup(self, text):
+        """Content-only lookup, for tabular paths that don't track positions."""
+        if not isinstance(text, str):
+            return None
+        return self.by_text.get(normalize_text(text))
+
+
+def _unique_positions(items) -> dict:
+    """text -> position for texts that occur exactly once among (position, text) items."""
+    once, repeated = {}, set()
+    for pos, text in items:
+        if text in once:
+            repeated.add(text)
+        once[text] = pos
+    return {text: pos for text, pos in once.items() if text not in repeated}
+
+
+def _increasing_pairs(pairs) -> list:
+    """Longest run of (new, old) pairs, sorted by new position, whose old positions also increase."""
+    tails, tail_idx, prev = [], [], [None] * len(pairs)
+    for n, (_, i) in enumerate(pairs):
+        k = bisect.bisect_left(tails, i)
+        if k == len(tails):
+            tails.append(i)
+            tail_idx.append(n)
+        else:
+            tails[k] = i
+            tail_idx[k] = n
+        prev[n] = tail_idx[k - 1] if k else None
+    out, n = [], tail_idx[-1] if tail_idx else None
+    while n is not None:
+        out.append(pairs[n])
+        n = prev[n]
+    return out[::-1]
+
+
+def entries_from_files(file_ext, source_file, translated_file, direction=None):
+    """Translation memory entries from a source file and its translation, paired unit by unit."""
+    translated = {key: text for key, text, _ in read_units(translated_file, file_ext)}
+    for key, text, _ in read_units(source_file, file_ext):
+        if key in translated:
+            yield from aligned_entries(text, translated[key], direction)
+
+
+# ──────────────────────────────────────────────
+# TABULAR DATA (UNIQUE-VALUE TRANSLATION)
+# ──────────────────────────────────────────────
+# Unique strings translated between progress updates
+TRANSLATE_BATCH_SIZE = 50
+
+
+def _text_columns(df) -> list:
+    return [c for c in df.columns if pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c])]
+
+
+def translate_frames(frames: dict, translate_value, progress_bar=None, status_text=None, report=None, max_workers=TEXT_WORKERS) -> dict:
+    """
+    Translates the string cells and headers of {sheet name: DataFrame}. Each
+    distinct string is translated once and the results are applied per column
+    with Series.map, so the cost follows the number of unique strings rather
+    than the number of cells. The strings of a batch are translated on a
+    thread pool (the backend scheduler still caps provider calls); each call
+    `translate_value(text, report)` gets a report of its own, merged into
+    `report` in order.
+    """
+    if status_text: status_text.text("Collecting unique values...")
+    values = {}
+    for df_sheet in frames.values():
+        for c in df_sheet.columns:
+            values.setdefault(str(c), None)
+        for c in _text_columns(df_sheet):
+            for val in pd.unique(df_sheet[c].dropna()):
+                if isinstance(val, str):
+                    values.setdefault(val, None)
+
+    unique = list(values)
+    total = len(unique) or 1
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="frames")
+    try:
+        for start in range(0, len(unique), TRANSLATE_BATCH_SIZE):
+            batch = unique[start:start + TRANSLATE_BATCH_SIZE]
+            reports = [JobReport() for _ in batch]
+            futures = [run_in_context(executor, translate_value, val, rep) for val, rep in zip(batch, reports)]
+            for val, future, rep in zip(batch, futures, reports):
+                values[val] = future.result()
+                if report is not None: report.merge(rep)
+            done = start + len(batch)
+            if progress_bar: progress_bar.progress(done / total)
+            if status_text: status_text.text(f"Processing... {int(done / total * 100)}%")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    out = {}
+    for sheet_name, df_sheet in frames.items():
+        df_sheet = df_sheet.copy()
+        for c in _text_columns(df_sheet):
+            col = df_sheet[c]
+            mapped = col.map(values)
+            df_sheet[c] = mapped.where(mapped.notna(), col)
+        df_sheet.columns = [values[str(c)] for c in df_sheet.columns]
+        out[sheet_name] = df_sheet
+    if progress_bar: progress_bar.progress(1.0)
+    if status_text: status_text.text("Processing... 100%")
+    return out
+
+
+# ──────────────────────────────────────────────
+# DOCUMENT PROCESSING (WITH % STATUS)
+# ──────────────────────────────────────────────
+def translate_docx_file(input_file, glossary, direction, progress_bar=None, status_text=None, report=None, skip_rules=SKIP_RULES, memory=None, previous=None, offline=False):
+    doc = lazy_import("docx").Document(input_file)
+
+    # 1. Collect all items (Paragraphs + Table Cells)
+    units = docx_units(doc)
+    total_items = len(units)
+    if total_items == 0: total_items = 1
+    current_item = 0
+    translation_memory = memory if memory is not None else TranslationMemory()
+    reuse = previous.align(units) if previous is not None else {}
+
+    # Helper to update progress
+    def update_prog():
+        nonlocal current_item
+        current_item += 1
+        pct = int((current_item / total_items) * 100)
+
+        if progress_bar:
+            progress_bar.progress(min(current_item / total_items, 1.0))
+        if status_text:
+            status_text.text(f"Processing... {pct}%")
+
+    # 2. Translate (or carry over) each item
+    for key, text, set_text in units:
+        if text.strip():
+            if key in reuse:
+                translated = reuse[key]
+                if report is not None: report.reused += 1
+            else:
+                translated = translate_segment(text, glossary, direction, cache=translation_memory, report=report, skip_rules=skip_rules, offline=offline)
+            set_text(translated)
+        update_prog()
+
+    output_buffer = spooled_buffer()
+    doc.save(output_buffer)
+    output_buffer.seek(0)
+    return output_buffer
+
+def convert_and_translate_pdf(input_file, glossary, direction, progress_bar=None, status_text=None, report=None, skip_rules=SKIP_RULES, memory=None, previous=None, offline=False):
+    # `previous` is accepted for a uniform handler signature; PDFs have no update mode
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tf_input:
+        shutil.copyfileobj(input_file, tf_input)
+        temp_input_path = tf_input.name
+    temp_docx_path = temp_input_path.replace(".pdf", ".docx")
+
+    try:
+        if status_text: status_text.text("Converting PDF to editable format...")
+        cv = lazy_import("pdf2docx").Converter(temp_input_path)
+        cv.convert(temp_docx_path, start=0, end=None)
+        cv.close()
+
+        if status_text: status_text.text("Starting Translation...")
+        with open(temp_docx_path, "rb") as f:
+            docx_buffer = translate_docx_file(f, glossary, direction, progress_bar, status_text, report, skip_rules, memory, offline=offline)
+        return docx_buffer
+    finally:
+        if os.path.exists(temp_input_path): os.remove(temp_input_path)
+        if os.path.exists(temp_docx_path): os.remove(temp_docx_path)
+
+def translate_excel_file(input_file, glossary, direction, is_legacy=False, progress_bar=None, status_text=None, report=None, skip_rules=SKIP_RULES, memory=None, previous=None, offline=False):
+    """
+    Translates Excel with caching and percentage progress.
+    """
+    output_buffer = spooled_buffer()
+    translation_memory = memory if memory is not None else TranslationMemory()
+
+    def translate_value(x, value_report):
+        reused = previous.lookup(x) if previous is not None else None
+        if reused is not None:
+            value_report.reused += 1
+            return reused
+        return translate_segment(x, glossary, direction, cache=translation_memory, report=value_report, skip_rules=skip_rules, offline=offline)
+
+    if is_legacy:
+        # Legacy XLS handling
+        try:
+            xls = pd.read_excel(input_file, sheet_name=None)
+            xls = translate_frames(xls, translate_value, progress_bar, status_text, report)
+            with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
+                for sheet_name, df_sheet in xls.items():
+                    df_sheet.to_excel(writer, sheet_name=sheet_name, index=False)
+            output_buffer.seek(0)
+            return output_buffer
+        except Exception as e:
+            return None
+    else:
+        # Modern XLSX (OpenPyXL)
+        wb = lazy_import("openpyxl").load_workbook(input_file)
+
+        # 1. Pre-calculate total non-empty string cells
+        if status_text: status_text.text("Analyzing file structure...")
+        units = xlsx_units(wb)
+        reuse = previous.align(units) if previous is not None else {}
+
+        total_cells = len(units)
+        if total_cells == 0: total_cells = 1
+
+        # 2. Iterate and Translate (or carry over)
+        for i, (key, text, set_value) in enumerate(units):
+            if key in reuse:
+                translated = reuse[key]
+                if report is not None: report.reused += 1
+            else:
+                translated = translate_segment(text, glossary, direction, cache=translation_memory, report=report, skip_rules=skip_rules, offline=offline)
+            set_value(translated)
+
+            # Update Progress
+            if i % 5 == 0 or i == total_cells - 1:
+                pct = int(((i + 1) / total_cells) * 100)
+                if progress_bar: progress_bar.progress((i + 1) / total_cells)
+                if status_text: status_text.text(f"Processing... {pct}%")
+
+        wb.save(output_buffer)
+        output_buffer.seek(0)
+        return output_buffer
+
+def translate_csv_file(input_file, glossary, direction, progress_bar=None, status_text=None, report=None, skip_rules=SKIP_RULES, memory=None, previous=None, offline=False):
+    try:
+        df_csv = pd.read_csv(input_file)
+        translation_memory = memory if memory is not None else TranslationMemory()
+
+        def translate_value(x, value_report):
+            reused = previous.lookup(x) if previous is not None else None
+            if reused is not None:
+                value_report.reused += 1
+                return reused
+            return translate_segment(x, glossary, direction, cache=translation_memory, report=value_report, skip_rules=skip_rules, offline=offline)
+
+        df_csv = translate_frames({"csv": df_csv}, translate_value, progress_bar, status_text, report)["csv"]
+
+        output_buffer = spooled_buffer()
+        df_csv.to_csv(output_buffer, index=False, encoding='utf-8-sig')
+        output_buffer.seek(0)
+        return output_buffer
+    except Exception as e:
+        return None
+
+
+# ──────────────────────────────────────────────
+# FORMAT REGISTRY (DISPATCH BY FILE TYPE)
+# ──────────────────────────────────────────────
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class FormatHandler:
+    """A document format: its translate function, output type and the modules it needs."""
+
+    def __init__(self, translate, output_ext, mime_type, modules=()):
+        self.translate = translate
+        self.output_ext = output_ext
+        self.mime_type = mime_type
+        self.modules = tuple(modules)
+
+    def load(self) -> "FormatHandler":
+        """Imports the format's dependencies (first use only, timed)."""
+        for name in self.modules:
+            lazy_import(name)
+        return self
+
+
+FORMATS = {}
+
+
+def register_format(ext, translate, output_ext, mime_type, modules=()):
+    FORMATS[ext] = FormatHandler(translate, output_ext, mime_type, modules)
+
+
+register_format("docx", translate_docx_file, "docx", DOCX_MIME, ["docx"])
+register_format("pdf", convert_and_translate_pdf, "docx", DOCX_MIME, ["pdf2docx", "docx", "pymupdf"])
+register_format("xlsx", translate_excel_file, "xlsx", XLSX_MIME, ["openpyxl"])
+register_format("xls", partial(translate_excel_file, is_legacy=True), "xlsx", XLSX_MIME, ["openpyxl"])
+register_format("csv", translate_csv_file, "csv", "text/csv")
+
+SUPPORTED_TYPES = list(FORMATS)
+
+
+def format_modules() -> list:
+    """Every module the registered formats import lazily (for warm-up)."""
+    return list(dict.fromkeys(name for handler in FORMATS.values() for name in handler.modules))
+
+
+def file_extension(name) -> str:
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+
+def output_name(name):
+    """(translated file name, mime type) for an input file name."""
+    handler = FORMATS.get(file_extension(name))
+    out_ext, mime_type = (handler.output_ext, handler.mime_type) if handler else (file_extension(name), "application/octet-stream")
+    stem = name.rsplit(".", 1)[0]
+    folder, _, base = stem.rpartition("/")
+    return f"{folder + '/' if folder else ''}Translated_{base}.{out_ext}", mime_type
+
+
+def translate_document(name, input_file, glossary, direction, progress_bar=None, status_text=None, report=None, skip_rules=SKIP_RULES, memory=None, previous=None, offline=False, verify=False):
+    """
+    Translates one uploaded file, picking the handler from its extension.
+    Returns a spooled buffer (rewound) or None; records peak memory on `report`
+    and, with `verify`, the glossary consistency check as `report.consistency`.
+    """
+    file_ext = file_extension(name)
+    if file_ext not in FORMATS:
+        raise ValueError(f"Unsupported file type: .{file_ext}")
+    handler = FORMATS[file_ext].load()
+    with MemoryMeter() as meter:
+        output = handler.translate(
+            input_file, glossary, direction,
+            progress_bar=progress_bar, status_text=status_text, report=report, skip_rules=skip_rules,
+            memory=memory, previous=previous, offline=offline,
+        )
+    if report is not None:
+        report.peak_memory = meter.peak
+        if verify and output is not None:
+            if status_text: status_text.text("Checking glossary terms...")
+            input_file.seek(0)
+            report.consistency = verify_translation(name, input_file, output, glossary, direction)
+            output.seek(0)
+    return output
+
+
+def verify_translation(name, source_file, translated_file, glossary, direction):
+    """
+    Glossary consistency of a translated file against its source, unit by unit.
+    None for PDFs (the source has no editable units to pair with).
+    """
+    file_ext = file_extension(name)
+    if file_ext not in ("docx", "xlsx", "xls", "csv"):
+        return None
+    translated = {key: text for key, text, _ in read_units(translated_file, file_ext)}
+    pairs = [(text, translated.get(key, "")) for key, text, _ in read_units(source_file, file_ext)]
+    return check_pairs(pairs, as_glossary(glossary), direction)
+
+
+# ──────────────────────────────────────────────
+# DRY-RUN PLANNING
+# ──────────────────────────────────────────────
+class JobPlan:
+    """What translating some files would send to the backend, after dedup, memory and glossary."""
+
+    def __init__(self):
+        self.files = 0
+        self.units = 0            # paragraphs / cells / text blocks
+        self.report = JobReport()  # per unique unit: segments, skipped, glossary and memory hits
+        self.pending = {}         # normalized sentence -> characters, for the backend
+
+    @property
+    def backend_calls(self) -> int:
+        return len(self.pending)
+
+    @property
+    def billable_chars(self) -> int:
+        return sum(self.pending.values())
+
+    def estimated_seconds(self, latency: float, parallel: int = MAX_BACKEND_CALLS) -> float:
+        """Wall time if calls take `latency` seconds and `parallel` run at once."""
+        return math.ceil(self.backend_calls / parallel) * latency
+
+    def merge(self, other: "JobPlan"):
+        self.files += other.files
+        self.units += other.units
+        self.report.merge(other.report)
+        self.pending.update(other.pending)
+
+    def summary(self, latency: float) -> str:
+        rep = self.report
+        return (
+            f"{self.billable_chars:,} billable characters · {self.backend_calls:,} backend calls · "
+            f"~{self.estimated_seconds(latency):.1f} s · {rep.segments:,} sentences in {self.units:,} units · "
+            f"{rep.cache_hits:,} from memory · {rep.glossary_hits:,} from glossary · "
+            f"{sum(rep.skipped.values()):,} passed through"
+        )
+
+
+def plan_texts(name, input_file) -> list:
+    """Translatable texts of a file, without converting or writing anything (PDF: text blocks)."""
+    file_ext = file_extension(name)
+    if file_ext == "pdf":
+        pymupdf = lazy_import("pymupdf")
+        # Opened from a temp file in chunks, not from one in-memory copy of the upload
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tf_input:
+            shutil.copyfileobj(input_file, tf_input)
+        try:
+            with pymupdf.open(tf_input.name) as pdf:
+                # Block tuples end with (block number, block type); type 0 is text
+                return [block[4] for page in pdf for block in page.get_text("blocks") if block[6] == 0]
+        finally:
+            os.remove(tf_input.name)
+    return [text for _, text, _ in read_units(input_file, file_ext)]
+
+
+def plan_document(name, input_file, glossary, direction, skip_rules=SKIP_RULES, memory=None) -> JobPlan:
+    """
+    Dry run of translate_document: runs the real pipeline offline over the
+    file's unique texts, so whatever the glossary or memory can't cover is
+    exactly what would be sent. The memory's hit ratio is left untouched.
+    """
+    plan = JobPlan()
+    plan.files = 1
+    cache = MemoryPeek(memory) if memory is not None else {}
+    glossary = as_glossary(glossary)
+    input_file.seek(0)
+    try:
+        texts = plan_texts(name, input_file)
+    finally:
+        input_file.seek(0)
+    plan.units = len(texts)
+    for text in dict.fromkeys(texts):
+        start = len(plan.report.untranslated)
+        translate_segment(text, glossary, direction, cache=cache, report=plan.report, skip_rules=skip_rules, offline=True)
+        for sentence in plan.report.untranslated[start:]:
+            key = normalize_text(sentence)
+            plan.pending[key] = len(key)
+    return plan
+
+
+# ──────────────────────────────────────────────
+# BATCH (MULTI-FILE / ZIP) TRANSLATION
+# ──────────────────────────────────────────────
+# Files translated at once across all sessions; each file's segments still
+# share the process-wide translation memory and backend scheduler.
+MAX_PARALLEL_FILES = 4
+_file_slots = threading.BoundedSemaphore(MAX_PARALLEL_FILES)
+
+
+def expand_uploads(uploaded_files) -> list:
+    """
+    (name, file object) for every supported file, unpacking ZIP archives.
+    Archive members are named "<archive stem>/<member path>", so the same path
+    in two archives stays apart.
+    """
+    items = []
+    for up in uploaded_files:
+        if file_extension(up.name) != "zip":
+            if file_extension(up.name) in SUPPORTED_TYPES:
+                items.append((up.name, up))
+            continue
+        prefix = os.path.splitext(os.path.basename(up.name))[0]
+        with zipfile.ZipFile(up) as archive:
+            for info in archive.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                    continue
+                if file_extension(name) in SUPPORTED_TYPES:
+                    with archive.open(info) as member:
+                        items.append((f"{prefix}/{name}", spool_copy(member)))
+    return items
+
+
+def unique_names(names) -> list:
+    """The names with " (2)", " (3)"... added before the extension of repeats."""
+    seen, out = set(), []
+    for name in names:
+        stem, dot, ext = name.rpartition(".") if "." in name.rpartition("/")[2] else (name, "", "")
+        candidate, n = name, 1
+        while candidate in seen:
+            n += 1
+            candidate = f"{stem} ({n}){dot}{ext}"
+        seen.add(candidate)
+        out.append(candidate)
+    return out
+
+
+class BatchCancelled(Exception):
+    """The batch was cancelled while this file was being translated."""
+
+
+class _ProgressSink:
+    """
+    Stands in for st.progress / st.empty inside worker threads. Documents
+    report progress often, so this is also where a cancelled batch stops them.
+    """
+
+    def __init__(self, state, index, cancelled):
+        self.state = state
+        self.index = index
+        self.cancelled = cancelled
+
+    def _check(self):
+        if self.cancelled.is_set():
+            raise BatchCancelled("Cancelled")
+
+    def progress(self, value):
+        self._check()
+        # The UI passes 100 for "done"; documents pass fractions
+        self.state[self.index][0] = value / 100 if value > 1 else value
+
+    def text(self, message):
+        self._check()
+        self.state[self.index][1] = message
+
+
+class BatchTranslation:
+    """
+    Translates many files concurrently and streams each result into one ZIP
+    archive as soon as it is ready. Progress is polled by the UI thread.
+    """
+
+    def __init__(self, items, glossary, direction, skip_rules=SKIP_RULES, memory=None, output=None, offline=False, verify=False):
+        self.items = items
+        self.glossary = glossary
+        self.direction = direction
+        self.skip_rules = skip_rules
+        self.memory = memory if memory is not None else TranslationMemory()
+        self.offline = offline
+        self.verify = verify
+        self.output = output if output is not None else spooled_buffer()
+        self.progress = [[0.0, "Queued"] for _ in items]
+        self.reports = [JobReport() for _ in items]
+        self.errors = {}
+        # Archive entry per file; repeated names would be duplicate ZIP members
+        self.output_names = unique_names(output_name(name)[0] for name, _ in items)
+        self._cancelled = threading.Event()
+        self._zip = zipfile.ZipFile(self.output, "w", compression=zipfile.ZIP_DEFLATED)
+        self._zip_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_FILES, max(len(items), 1)), thread_name_prefix="batch")
+        # Workers inherit the caller's scheduling tag (user, bulk priority)
+        self._futures = [run_in_context(self._executor, self._run, i) for i in range(len(items))]
+
+    def _run(self, index):
+        name, input_file = self.items[index]
+        sink = _ProgressSink(self.progress, index, self._cancelled)
+        with _file_slots:
+            try:
+                sink.text("Processing... 0%")
+                buffer = translate_document(name, input_file, self.glossary, self.direction, sink, sink, self.reports[index], self.skip_rules, self.memory, offline=self.offline, verify=self.verify)
+            except Exception as e:
+                buffer = None
+                self.errors[index] = str(e)
+        if buffer is None:
+            self.errors.setdefault(index, "Failed to generate output data.")
+            self.progress[index][1] = f"❌ {self.errors[index]}"
+            return
+        # Stream the spooled output into the archive, then drop it
+        with self._zip_lock, self._zip.open(self.output_names[index], "w") as dst:
+            shutil.copyfileobj(buffer, dst)
+        buffer.close()
+        checked = self.reports[index].consistency
+        self.progress[index] = [1.0, f"✅ Done · {checked.summary()}" if checked is not None else "✅ Done"]
+
+    @property
+    def overall(self) -> float:
+        return sum(p[0] for p in self.progress) / len(self.progress) if self.progress else 1.0
+
+    def done(self) -> bool:
+        return all(f.done() for f in self._futures)
+
+    def finish(self):
+        """Waits for all files, closes the archive and returns it rewound for download."""
+        for f in self._futures:
+            f.result()
+        self._executor.shutdown()
+        self._zip.close()
+        self.output.seek(0)
+        return self.output
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Drops queued files and stops running ones at their next progress update."""
+        self._cancelled.set()
+        for i, f in enumerate(self._futures):
+            if f.cancel():
+                self.errors[i] = "Cancelled"
+                self.progress[i][1] = "❌ Cancelled"
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Release the partial archive once the running files have stopped
+        threading.Thread(target=self._discard, daemon=True).start()
+
+    def _discard(self):
+        wait(self._futures)
+        with self._zip_lock:
+            self._zip.close()
+        self.output.close()
+
+    def summary(self) -> JobReport:
+        total = JobReport()
+        for rep in self.reports:
+            total.merge(rep)
+        return total
@@ -0,0 +1,96 @@
+"""
+Paginated, sortable catalog grid with on-demand CSV/XLSX export.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import io
+from functools import partial
+
+import streamlit as st
+
+from buffers import XLSX_MIME, export_file, finish_export
+from loader import lazy_import
+
+PAGE_SIZES = [25, 50, 100, 250]
+CATALOG_ORDER = "(catalog order)"
+
+# Rows serialized per chunk while exporting
+EXPORT_CHUNK = 5000
+
+
+# ──────────────────────────────────────────────
+# STREAMED EXPORT
+# ──────────────────────────────────────────────
+def export_csv(df, rows):
+    """CSV file of `df` rows `rows`, written in chunks to disk (BOM so Excel reads Japanese)."""
+    writer = export_file()
+    text = io.TextIOWrapper(writer, encoding="utf-8-sig", newline="")
+    for start in range(0, max(len(rows), 1), EXPORT_CHUNK):
+        df.iloc[rows[start:start + EXPORT_CHUNK]].to_csv(text, index=False, header=start == 0)
+    text.flush()
+    return finish_export(text.detach())
+
+
+def export_xlsx(df, rows):
+    """XLSX file of `df` rows `rows` through a write-only workbook (rows are streamed, not held as cells)."""
+    openpyxl = lazy_import("openpyxl")
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Catalog")
+    ws.append(list(df.columns))
+    for start in range(0, len(rows), EXPORT_CHUNK):
+        for values in df.iloc[rows[start:start + EXPORT_CHUNK]].itertuples(index=False, name=None):
+            ws.append(list(values))
+    writer = export_file()
+    wb.save(writer)
+    return finish_export(writer)
+
+
+# ──────────────────────────────────────────────
+# GRID
+# ──────────────────────────────────────────────
+def data_grid(catalog, rows, key="grid"):
+    """
+    Shows catalog rows `rows` (positions) one page at a time. Sorting uses the
+    snapshot's precomputed column orders, and only the visible page is sent
+    to the browser; exports are built when a download is clicked.
+    """
+    df = catalog.df
+    total = len(rows)
+
+    c_sort, c_desc, c_size, c_page = st.columns([3, 2, 2, 2])
+    sort_col = c_sort.selectbox("Sort by", [CATALOG_ORDER] + list(df.columns), key=f"{key}_sort")
+    descending = c_desc.toggle("Descending", key=f"{key}_desc")
+    page_size = c_size.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+    pages = max(1, -(-total // page_size))
+    # A narrower filter can leave the remembered page past the end
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = c_page.number_input("Page", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    if sort_col != CATALOG_ORDER:
+        rows = catalog.sorted_rows(rows, sort_col, descending)
+    elif descending:
+        rows = rows[::-1]
+
+    start = (page - 1) * page_size
+    visible = rows[start:start + page_size]
+    st.dataframe(df.iloc[visible], width="stretch", hide_index=True)
+    st.caption(f"Rows {min(start + 1, total)}–{start + len(visible)} of {total} · page {page} of {pages}")
+
+    c_csv, c_xlsx, _ = st.columns([2, 2, 5])
+    c_csv.download_button(
+        "📥 Export CSV",
+        data=partial(export_csv, df, rows),
+        file_name="catalog_export.csv",
+        mime="text/csv",
+        on_click="ignore",
+        key=f"{key}_csv",
+    )
+    c_xlsx.download_button(
+        "📥 Export XLSX",
+        data=partial(export_xlsx, df, rows),
+        file_name="catalog_export.xlsx",
+        mime=XLSX_MIME,
+        on_click="ignore",
+        key=f"{key}_xlsx",
+    )
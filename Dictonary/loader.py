@@ -0,0 +1,78 @@
+"""
+Deferred imports for heavy dependencies, with per-module and per-stage timings.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import importlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Loaded before streamlit (so its import can be timed): give the logger its own
+# INFO-level console handler instead of streamlit.logger.get_logger
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# One lock per module, so a slow import never blocks an unrelated one
+_locks = {}
+_locks_guard = threading.Lock()
+
+# name -> seconds spent on the first import (modules and startup stages)
+IMPORT_TIMINGS = {}
+
+
+def _module_lock(name: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def lazy_import(name: str):
+    """Imports `name` on first use and records how long that took."""
+    if name in IMPORT_TIMINGS:
+        return importlib.import_module(name)
+    with _module_lock(name):
+        if name in IMPORT_TIMINGS:
+            return importlib.import_module(name)
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        IMPORT_TIMINGS[name] = time.perf_counter() - start
+    logger.info("Imported %s in %.0f ms", name, IMPORT_TIMINGS[name] * 1000)
+    return module
+
+
+@contextmanager
+def import_stage(name: str):
+    """Times a block of startup imports; only the first (cold) run is recorded."""
+    start = time.perf_counter()
+    yield
+    if name not in IMPORT_TIMINGS:
+        IMPORT_TIMINGS[name] = time.perf_counter() - start
+        logger.info("Startup stage %s took %.0f ms", name, IMPORT_TIMINGS[name] * 1000)
+
+
+def import_timings() -> list:
+    """Recorded import and startup-stage timings, slowest first (for the debug panel)."""
+    return [
+        {"Module / stage": name, "ms": round(seconds * 1000)}
+        for name, seconds in sorted(IMPORT_TIMINGS.items(), key=lambda item: -item[1])
+    ]
+
+
+def warm_up(modules) -> threading.Thread:
+    """Imports `modules` on a background thread so the first real use doesn't wait."""
+    def run():
+        for name in modules:
+            try:
+                lazy_import(name)
+            except ImportError as e:
+                logger.warning("Warm-up could not import %s: %s", name, e)
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
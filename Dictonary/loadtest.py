@@ -0,0 +1,474 @@
+"""
+Load test for the dictionary apps: N concurrent browser-like sessions against one server.
+Developed by Mirza Muhammad Mobeen
+
+Starts `streamlit run <app>` on the offline stub provider and drives it over
+Streamlit's own websocket protocol (widget states, file uploads), so every
+session runs the real script on the real server. Concurrency is stepped
+through --levels; each level reports latency percentiles, throughput and
+server memory growth per session, and the run ends with the saturation point.
+
+    python loadtest.py translate.py --levels 1,2,4,8,16 --duration 30
+    python loadtest.py app.py --levels 4,8,16,32 --think 0.5
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from urllib.parse import urljoin
+
+import requests
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import FileUploaderState, UploadedFileInfo
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from catalog import read_catalog
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CATALOG_PATH = os.path.join(HERE, "Bilingual Automation Action and Activity Catalog.csv")
+
+# Widgets the scenarios drive, by label or key
+SEARCH_BOX = "search_input"
+TEXT_INPUT = "Write here..."
+TEXT_BUTTON = "Translate Text"
+FILE_INPUT = "Upload your document(s)"
+FILE_BUTTON = "Start Translation"
+
+RUN_FINISHED = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY}
+
+
+# ──────────────────────────────────────────────
+# SERVER
+# ──────────────────────────────────────────────
+def start_server(app, port, env_overrides) -> subprocess.Popen:
+    """`streamlit run app` on the stub backend; returns once the health check answers."""
+    env = dict(os.environ, DICTIONARY_PROVIDERS="stub", **env_overrides)
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", app,
+            "--server.headless", "true",
+            "--server.port", str(port),
+            "--server.enableXsrfProtection", "false",
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+        ],
+        cwd=HERE,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    health = f"http://localhost:{port}/_stcore/health"
+    for _ in range(120):
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {server.returncode}")
+        try:
+            if requests.get(health, timeout=1).ok:
+                return server
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("streamlit did not start within 60 s")
+
+
+def server_rss(pid):
+    """Resident memory of the server process in bytes (Linux /proc), else None."""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+# ──────────────────────────────────────────────
+# HEADLESS SESSION
+# ──────────────────────────────────────────────
+class Session:
+    """
+    One browser tab: keeps its widget values between reruns, like the
+    frontend does, and reports how long each rerun took on the server.
+    """
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.ws = None
+        self.session_id = None
+        self.page_hash = ""
+        self.widgets = {}    # label or key -> widget id
+        self.state = {}      # widget id -> WidgetState sent on every rerun
+
+    async def connect(self):
+        ws_url = self.base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def _receive(self) -> ForwardMsg:
+        msg = ForwardMsg()
+        msg.ParseFromString(await asyncio.wait_for(self.ws.recv(), self.timeout))
+        return msg
+
+    def _on_delta(self, delta, errors):
+        if delta.WhichOneof("type") != "new_element":
+            return
+        element = delta.new_element
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            errors.append(element.exception.message)
+            return
+        widget = getattr(element, kind)
+        widget_id = getattr(widget, "id", "")
+        if not widget_id.startswith("$$ID-"):
+            return
+        self.widgets[widget_id.rsplit("-", 1)[1]] = widget_id  # key ("None" when unkeyed)
+        label = getattr(widget, "label", "")
+        if label:
+            self.widgets[label] = widget_id
+
+    def has(self, name) -> bool:
+        return name in self.widgets
+
+    def set(self, name, **value):
+        """Remembers a widget value (a WidgetState field, e.g. string_value=...) for later reruns."""
+        state = WidgetState(id=self.widgets[name], **value)
+        self.state[state.id] = state
+
+    async def rerun(self, click=None):
+        """Reruns the script with the current widget values (and a button click); (seconds, errors)."""
+        msg = BackMsg()
+        client = msg.rerun_script
+        client.page_script_hash = self.page_hash
+        client.widget_states.widgets.extend(self.state.values())
+        if click is not None:
+            client.widget_states.widgets.append(WidgetState(id=self.widgets[click], trigger_value=True))
+
+        errors = []
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            reply = await self._receive()
+            kind = reply.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = reply.new_session.initialize.session_id
+                self.page_hash = reply.new_session.main_script_hash
+            elif kind == "delta":
+                self._on_delta(reply.delta, errors)
+            elif kind == "script_finished":
+                if reply.script_finished in RUN_FINISHED:
+                    return time.perf_counter() - started, errors
+                if reply.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    return time.perf_counter() - started, errors + ["script failed to compile"]
+
+    async def upload(self, name, data: bytes, mime: str) -> UploadedFileInfo:
+        """Uploads a file the way st.file_uploader does: ask for a URL, then PUT the bytes."""
+        msg = BackMsg()
+        request = msg.file_urls_request
+        request.request_id = uuid.uuid4().hex
+        request.session_id = self.session_id
+        request.file_names.append(name)
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            reply = await self._receive()
+            if reply.WhichOneof("type") == "file_urls_response" and reply.file_urls_response.response_id == request.request_id:
+                break
+        if reply.file_urls_response.error_msg:
+            raise RuntimeError(reply.file_urls_response.error_msg)
+        urls = reply.file_urls_response.file_urls[0]
+        response = await asyncio.to_thread(
+            requests.put, urljoin(self.base_url + "/", urls.upload_url.lstrip("/")),
+            files={"file": (name, data, mime)}, timeout=self.timeout,
+        )
+        response.raise_for_status()
+        info = UploadedFileInfo(name=name, size=len(data), file_id=urls.file_id)
+        info.file_urls.CopyFrom(urls)
+        return info
+
+
+# ──────────────────────────────────────────────
+# WORKLOAD
+# ──────────────────────────────────────────────
+SENTENCES = [
+    "Please {term} before the nightly run {n}.",
+    "The robot will {term} for order {n}.",
+    "If {term} fails, retry step {n} and notify the team.",
+    "Use {term} at the start of workflow {n}.",
+]
+
+
+class Workload:
+    """Realistic inputs drawn from the catalog: searches with typos, mixed-language text, documents."""
+
+    def __init__(self):
+        df = read_catalog(CATALOG_PATH)
+        self.terms_en = [t for t in df["Activity (English)"].tolist() + df["Action (English)"].tolist() if t]
+        self.terms_ja = [t for t in df["Activity (Japanese)"].tolist() + df["Action (Japanese)"].tolist() if t]
+
+    def query(self, rng) -> str:
+        term = rng.choice(self.terms_ja if rng.random() < 0.2 else self.terms_en)
+        roll = rng.random()
+        if roll < 0.3 and len(term) > 3:
+            i = rng.randrange(len(term) - 1)
+            term = term[:i] + term[i + 1] + term[i] + term[i + 2:]   # transposed letters
+        elif roll < 0.5:
+            term = term[:max(2, len(term) // 2)]                     # still typing
+        return term
+
+    def sentence(self, rng) -> str:
+        # Repeated numbers make some sentences memory hits, as in real traffic
+        return rng.choice(SENTENCES).format(term=rng.choice(self.terms_en).lower(), n=rng.randint(1, 200))
+
+    def text(self, rng) -> str:
+        return " ".join(self.sentence(rng) for _ in range(rng.randint(1, 3)))
+
+    def document(self, rng, rows=20) -> bytes:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["Step", "Description", "Owner"])
+        for i in range(rows):
+            writer.writerow([f"S-{i + 1:03d}", self.sentence(rng), rng.choice(self.terms_en)])
+        return out.getvalue().encode("utf-8")
+
+
+async def search(session, workload, rng):
+    session.set(SEARCH_BOX, json_value=json.dumps(workload.query(rng)))
+    return await session.rerun()
+
+
+async def translate_text(session, workload, rng):
+    session.set(TEXT_INPUT, string_value=workload.text(rng))
+    return await session.rerun(click=TEXT_BUTTON)
+
+
+async def translate_document(session, workload, rng):
+    started = time.perf_counter()
+    info = await session.upload(f"load_{uuid.uuid4().hex[:8]}.csv", workload.document(rng), "text/csv")
+    session.set(FILE_INPUT, file_uploader_state_value=FileUploaderState(uploaded_file_info=[info]))
+    _, errors = await session.rerun()
+    if not session.has(FILE_BUTTON):
+        return time.perf_counter() - started, errors + ["no translate button after upload"]
+    _, more = await session.rerun(click=FILE_BUTTON)
+    return time.perf_counter() - started, errors + more
+
+
+# action name -> (scenario, widget the app must have for it)
+ACTIONS = {
+    "search": (search, SEARCH_BOX),
+    "text": (translate_text, TEXT_INPUT),
+    "document": (translate_document, FILE_INPUT),
+}
+
+
+# ──────────────────────────────────────────────
+# RUNNER
+# ──────────────────────────────────────────────
+def percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] if values else float("nan")
+
+
+class LevelResult:
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.samples = []   # (action, seconds, ok)
+        self.elapsed = 0.0
+        self.rss_before = None
+        self.rss_after = None
+
+    @property
+    def throughput(self) -> float:
+        return len(self.samples) / self.elapsed if self.elapsed else 0.0
+
+    def latencies(self, action=None) -> list:
+        return [s for a, s, ok in self.samples if ok and (action is None or a == action)]
+
+    @property
+    def errors(self) -> int:
+        return sum(not ok for _, _, ok in self.samples)
+
+    @property
+    def growth_per_session(self):
+        if self.rss_before is None or self.rss_after is None:
+            return None
+        return (self.rss_after - self.rss_before) / self.sessions
+
+    def as_dict(self) -> dict:
+        actions = sorted({a for a, _, _ in self.samples})
+        return {
+            "sessions": self.sessions,
+            "requests": len(self.samples),
+            "errors": self.errors,
+            "throughput": self.throughput,
+            "rss_before": self.rss_before,
+            "rss_after": self.rss_after,
+            "growth_per_session": self.growth_per_session,
+            "latency": {
+                a: {q: percentile(self.latencies(a), p) for q, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+                for a in actions
+            },
+        }
+
+
+async def run_level(base_url, sessions, args, workload, server_pid) -> LevelResult:
+    result = LevelResult(sessions)
+    result.rss_before = server_rss(server_pid)
+    mix = {name: weight for name, weight in args.mix.items() if weight > 0}
+    clients = [Session(base_url, args.timeout) for _ in range(sessions)]
+    deadline = time.perf_counter() + args.duration
+
+    async def user(i, session):
+        rng = random.Random(args.seed * 1000 + sessions * 100 + i)
+        await session.connect()
+        seconds, errors = await session.rerun()
+        result.samples.append(("page load", seconds, not errors))
+        actions = [a for a in mix if session.has(ACTIONS[a][1])]
+        weights = [mix[a] for a in actions]
+        while actions and time.perf_counter() < deadline:
+            if args.think:
+                await asyncio.sleep(rng.expovariate(1 / args.think))
+            action = rng.choices(actions, weights)[0]
+            try:
+                seconds, errors = await ACTIONS[action][0](session, workload, rng)
+            except Exception as e:
+                seconds, errors = args.timeout, [repr(e)]
+            result.samples.append((action, seconds, not errors))
+            if errors and args.verbose:
+                print(f"  session {i} {action}: {errors[0]}", file=sys.stderr)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i, s) for i, s in enumerate(clients)))
+    result.elapsed = time.perf_counter() - started
+    # Measured while every session is still open
+    result.rss_after = server_rss(server_pid)
+    await asyncio.gather(*(s.close() for s in clients))
+    return result
+
+
+async def warm_up(base_url, args, workload):
+    """One session through every scenario, so caches and lazy imports aren't billed to the first level."""
+    session = Session(base_url, args.timeout)
+    await session.connect()
+    await session.rerun()
+    rng = random.Random(args.seed)
+    for scenario, widget in ACTIONS.values():
+        if session.has(widget):
+            await scenario(session, workload, rng)
+    await session.close()
+
+
+def saturation(levels, slo) -> str:
+    """First level where p95 breaks the SLO or throughput stops scaling with sessions."""
+    for prev, cur in zip(levels, levels[1:]):
+        p95 = percentile(cur.latencies(), 0.95)
+        if p95 > slo:
+            return f"saturated at {cur.sessions} sessions: p95 {p95 * 1000:.0f} ms is over the {slo * 1000:.0f} ms SLO"
+        expected = prev.throughput * (1 + 0.5 * (cur.sessions / prev.sessions - 1))
+        if cur.throughput < expected:
+            return (
+                f"saturated at {cur.sessions} sessions: throughput {prev.throughput:.1f} → "
+                f"{cur.throughput:.1f} req/s (less than half the added sessions' share)"
+            )
+    return f"no saturation up to {levels[-1].sessions} sessions"
+
+
+def report(levels, slo):
+    mb = 2 ** 20
+    print(f"\n{'sessions':>8} {'requests':>8} {'errors':>6} {'req/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'RSS MB':>7} {'MB/sess':>7}")
+    for level in levels:
+        lat = level.latencies()
+        growth = level.growth_per_session
+        print(
+            f"{level.sessions:>8} {len(level.samples):>8} {level.errors:>6} {level.throughput:>7.1f} "
+            f"{percentile(lat, 0.5) * 1000:>7.0f} {percentile(lat, 0.95) * 1000:>7.0f} {percentile(lat, 0.99) * 1000:>7.0f} "
+            f"{(level.rss_after or 0) / mb:>7.0f} {'' if growth is None else f'{growth / mb:.1f}':>7}"
+        )
+    print("\nPer action (p50 / p95 ms):")
+    for level in levels:
+        parts = [
+            f"{a} {percentile(level.latencies(a), 0.5) * 1000:.0f}/{percentile(level.latencies(a), 0.95) * 1000:.0f}"
+            for a in sorted({a for a, _, _ in level.samples})
+        ]
+        print(f"  {level.sessions:>4} sessions: " + " · ".join(parts))
+    print("\n" + saturation(levels, slo))
+
+
+def parse_mix(text) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r} (choose from {', '.join(ACTIONS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("app", nargs="?", default="translate.py", help="script to serve (translate.py or app.py)")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="concurrent sessions per step")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per step")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between a user's actions (s)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("search=6,text=3,document=1"), help="action weights")
+    parser.add_argument("--slo", type=float, default=2000, help="p95 latency objective in ms")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout (s)")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="stub provider latency (s)")
+    parser.add_argument("--stub-failure-rate", type=float, default=0.0, help="stub provider fault rate")
+    parser.add_argument("--port", type=int, default=8599)
+    parser.add_argument("--url", help="test an already running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="with --url: server process id, for memory figures")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    args.slo /= 1000
+    levels = [int(n) for n in args.levels.split(",")]
+
+    server = None
+    if args.url:
+        base_url, pid = args.url.rstrip("/"), args.pid
+    else:
+        print(f"Starting {args.app} on port {args.port} with the stub provider...")
+        server = start_server(args.app, args.port, {
+            "DICTIONARY_STUB_LATENCY": str(args.stub_latency),
+            "DICTIONARY_STUB_FAILURE_RATE": str(args.stub_failure_rate),
+        })
+        base_url, pid = f"http://localhost:{args.port}", server.pid
+
+    workload = Workload()
+    results = []
+    try:
+        print("Warming up...")
+        asyncio.run(warm_up(base_url, args, workload))
+        for sessions in levels:
+            print(f"→ {sessions} session(s) for {args.duration:.0f} s")
+            results.append(asyncio.run(run_level(base_url, sessions, args, workload, pid)))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report(results, args.slo)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as out:
+            json.dump({"app": args.app, "levels": [r.as_dict() for r in results], "saturation": saturation(results, args.slo)}, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
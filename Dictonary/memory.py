@@ -0,0 +1,167 @@
+"""
+Translation memory shared by the text and document translators.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import os
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+
+from catalog import as_glossary
+from segments import detect_direction, normalize_text, split_affixes, split_sentences
+
+
+# Sentences kept in the shared memory before the least recently used are evicted (0 = unbounded)
+MEMORY_MAX_ENTRIES = int(os.environ.get("DICTIONARY_MEMORY_MAX_ENTRIES", "200000"))
+
+
+class TranslationMemory:
+    """
+    Backend translations keyed by (direction, text sent to the backend).
+    Keys are single normalized sentences, so a revised document only misses
+    on the sentences that actually changed. Bounded to `max_entries`
+    sentences; hits keep an entry alive, inserts past the limit evict the
+    least recently used ones.
+    """
+
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __getitem__(self, key):
+        return self._entries[key]
+
+    def _evict(self):
+        # Caller holds the lock
+        while self.max_entries and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def update(self, entries) -> int:
+        """Bulk insert of (key, translation) pairs under one lock. Returns the number of new keys."""
+        entries = dict(entries)
+        with self._lock:
+            new = sum(key not in self._entries for key in entries)
+            for key, value in entries.items():
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            self._evict()
+            return new
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        return default if value is None else value
+
+    def peek(self, key, default=None):
+        """Lookup that doesn't count towards the hit ratio (job planning)."""
+        return self._entries.get(key, default)
+
+    def record(self, hits=0, misses=0):
+        """Counts lookups that were made through peek() or MemoryPeek."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class MemoryPeek:
+    """Read-only stand-in for a TranslationMemory whose lookups leave its hit/miss counters alone."""
+
+    def __init__(self, memory):
+        self.memory = memory
+
+    def get(self, key, default=None):
+        return self.memory.peek(key, default)
+
+    peek = get
+
+
+# ──────────────────────────────────────────────
+# WARM START
+# ──────────────────────────────────────────────
+REVERSE = {"En_to_Jp": "Jp_to_En", "Jp_to_En": "En_to_Jp"}
+
+
+def _core(sentence: str) -> str:
+    return normalize_text(split_affixes(sentence)[1])
+
+
+def aligned_entries(source: str, target: str, direction=None):
+    """
+    Memory entries for one aligned pair, in both directions. Keys match what the
+    translator looks up: one normalized sentence without its surrounding
+    punctuation. Multi-sentence pairs are used only when both sides split into
+    the same number of sentences.
+    """
+    if not isinstance(source, str) or not isinstance(target, str):
+        return
+    if direction not in REVERSE:
+        direction = detect_direction(source)
+        if direction is None:
+            return
+    src_sentences = [s for s in split_sentences(source) if _core(s)]
+    tgt_sentences = [s for s in split_sentences(target) if _core(s)]
+    if len(src_sentences) != len(tgt_sentences):
+        return
+    for src, tgt in zip(src_sentences, tgt_sentences):
+        src, tgt = _core(src), _core(tgt)
+        if src != tgt:
+            yield (direction, src), tgt
+            yield (REVERSE[direction], tgt), src
+
+
+def entries_from_catalog(glossary):
+    """
+    Entries from the catalog's voted term maps (a Glossary or catalog
+    DataFrame), so terms the catalog gives conflicting translations for
+    ("Log on", "Remove permission") are left to the backend, as in lookups.
+    """
+    glossary = as_glossary(glossary)
+    for direction in REVERSE:
+        for term, target in glossary.lookup_map(direction).items():
+            src, tgt = _core(term), _core(target)
+            if src and tgt and src != tgt:
+                yield (direction, src), tgt
+
+
+def entries_from_tmx(tmx_file):
+    """Entries from the English/Japanese variants of each <tu> in a TMX file (streamed)."""
+    for _, tu in ET.iterparse(tmx_file):
+        if tu.tag != "tu":
+            continue
+        segs = {}
+        for tuv in tu.iter("tuv"):
+            lang = (tuv.get(_XML_LANG) or tuv.get("lang") or "").lower()[:2]
+            seg = tuv.find("seg")
+            if lang in ("en", "ja") and seg is not None:
+                segs[lang] = _seg_text(seg)
+        if "en" in segs and "ja" in segs:
+            yield from aligned_entries(segs["en"], segs["ja"], "En_to_Jp")
+        tu.clear()
@@ -0,0 +1,142 @@
+"""
+Character metering and budgets for the paid translation providers.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import contextvars
+import datetime
+import os
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from scheduler import current_traffic
+
+# Characters one job may send, and one user per day (0 = unlimited)
+JOB_CHAR_BUDGET = int(os.environ.get("DICTIONARY_JOB_CHAR_BUDGET", "0"))
+USER_DAILY_CHAR_BUDGET = int(os.environ.get("DICTIONARY_USER_DAILY_CHAR_BUDGET", "0"))
+
+# Finished jobs kept for monitoring
+MAX_TRACKED_JOBS = 500
+
+_job = contextvars.ContextVar("metered_job", default=None)
+
+
+@contextmanager
+def metered_job(job_id: str):
+    """Charges provider calls made in this context (and in tasks it submits) to `job_id`."""
+    token = _job.set(job_id)
+    try:
+        yield
+    finally:
+        _job.reset(token)
+
+
+class BudgetExceeded(Exception):
+    """The running job or user has used up its character budget."""
+
+
+class BudgetDecision:
+    """Whether a planned job may run now: "run", "defer" (user's daily budget) or "reject" (job budget)."""
+
+    def __init__(self, action, reason=""):
+        self.action = action
+        self.reason = reason
+
+    @property
+    def allowed(self) -> bool:
+        return self.action == "run"
+
+
+class UsageMeter:
+    """
+    Characters sent to providers per job, user (today) and provider. Hedged
+    duplicates are billed too: each provider charges for what it receives.
+    """
+
+    def __init__(self, job_budget=JOB_CHAR_BUDGET, user_budget=USER_DAILY_CHAR_BUDGET):
+        self.job_budget = job_budget
+        self.user_budget = user_budget
+        self._lock = threading.Lock()
+        self._day = datetime.date.today()
+        self.by_user = Counter()       # today
+        self.by_provider = Counter()
+        self.calls = Counter()         # per provider
+        self.by_job = OrderedDict()    # most recent last
+        self.total = 0
+
+    def _roll_day(self):
+        today = datetime.date.today()
+        if today != self._day:
+            self._day = today
+            self.by_user.clear()
+
+    def record(self, provider: str, chars: int):
+        """Bills `chars` sent to `provider` to the current user and job."""
+        user, _ = current_traffic()
+        job = _job.get()
+        with self._lock:
+            self._roll_day()
+            self.total += chars
+            self.by_user[user] += chars
+            self.by_provider[provider] += chars
+            self.calls[provider] += 1
+            if job is not None:
+                self.by_job[job] = self.by_job.pop(job, 0) + chars
+                while len(self.by_job) > MAX_TRACKED_JOBS:
+                    self.by_job.popitem(last=False)
+
+    def check(self):
+        """Raises BudgetExceeded when the current job or user has no characters left."""
+        user, _ = current_traffic()
+        job = _job.get()
+        with self._lock:
+            self._roll_day()
+            if self.job_budget and job is not None and self.by_job.get(job, 0) >= self.job_budget:
+                raise BudgetExceeded(f"job {job} reached its {self.job_budget:,}-character budget")
+            if self.user_budget and self.by_user[user] >= self.user_budget:
+                raise BudgetExceeded(f"daily budget of {self.user_budget:,} characters used up")
+
+    def remaining(self, user: str):
+        """Characters `user` may still send today (None = unlimited)."""
+        with self._lock:
+            self._roll_day()
+            return max(self.user_budget - self.by_user[user], 0) if self.user_budget else None
+
+    def decide(self, chars: int, user: str) -> BudgetDecision:
+        """Admission check for a planned job sending about `chars` characters."""
+        if self.job_budget and chars > self.job_budget:
+            return BudgetDecision("reject", f"needs ~{chars:,} characters; the per-job limit is {self.job_budget:,}")
+        left = self.remaining(user)
+        if left is not None and chars > left:
+            return BudgetDecision("defer", f"needs ~{chars:,} characters but only {left:,} are left today; retry after the daily reset")
+        return BudgetDecision("run")
+
+    def job_chars(self, job: str) -> int:
+        with self._lock:
+            return self.by_job.get(job, 0)
+
+    def snapshot(self) -> dict:
+        """Counters for monitoring."""
+        with self._lock:
+            self._roll_day()
+            return {
+                "total": self.total,
+                "day": self._day.isoformat(),
+                "by_user": dict(self.by_user),
+                "by_provider": dict(self.by_provider),
+                "calls": dict(self.calls),
+                "by_job": dict(self.by_job),
+            }
+
+
+_meter = None
+_meter_lock = threading.Lock()
+
+
+def get_meter() -> UsageMeter:
+    global _meter
+    with _meter_lock:
+        if _meter is None:
+            _meter = UsageMeter()
+        return _meter
@@ -0,0 +1,376 @@
+"""
+Translation providers behind one router: latency-ranked, hedged, circuit-broken.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import abc
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from loader import lazy_import
+from metering import BudgetExceeded, get_meter
+from scheduler import MAX_BACKEND_CALLS, run_in_context
+
+
+class ProviderError(Exception):
+    """A provider call failed."""
+
+
+class ProvidersUnavailable(Exception):
+    """Every provider failed, is circuit-broken, or the character budget is used up."""
+
+
+# ──────────────────────────────────────────────
+# PROVIDERS
+# ──────────────────────────────────────────────
+class Provider(abc.ABC):
+    name = "provider"
+
+    @abc.abstractmethod
+    def translate(self, text: str, source: str, target: str) -> str:
+        """`text` translated from `source` to `target` ("en"/"ja"); raises on failure."""
+
+
+class DeepTranslatorProvider(Provider):
+    """One deep-translator backend; `codes` maps our "en"/"ja" to the codes it expects."""
+
+    def __init__(self, name, class_name, codes=None, **options):
+        self.name = name
+        self.class_name = class_name
+        self.codes = codes or {}
+        self.options = options
+
+    def translate(self, text, source, target):
+        cls = getattr(lazy_import("deep_translator"), self.class_name)
+        translator = cls(source=self.codes.get(source, source), target=self.codes.get(target, target), **self.options)
+        return translator.translate(text)
+
+
+class StubProvider(Provider):
+    """
+    Local provider for tests and load runs: sleeps `latency` (+ up to `jitter`,
+    or `spike_latency` on a `spike_rate` fraction of calls) and fails on a
+    `failure_rate` fraction. Returns `output(text, source, target)`, by
+    default the text tagged with the target language.
+    """
+
+    def __init__(self, name="stub", latency=0.0, jitter=0.0, failure_rate=0.0,
+                 spike_rate=0.0, spike_latency=0.0, output=None, seed=None):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.spike_rate = spike_rate
+        self.spike_latency = spike_latency
+        self.output = output
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def translate(self, text, source, target):
+        with self._lock:
+            self.calls += 1
+            spike = self._rng.random() < self.spike_rate
+            delay = self.spike_latency if spike else self.latency + self._rng.random() * self.jitter
+            fail = self._rng.random() < self.failure_rate
+        time.sleep(delay)
+        if fail:
+            raise ProviderError(f"{self.name}: injected fault")
+        return self.output(text, source, target) if self.output else f"{text} [{target}]"
+
+
+def _stub_provider():
+    """Offline stand-in for load tests; tune it with DICTIONARY_STUB_* variables."""
+    return StubProvider(
+        latency=float(os.environ.get("DICTIONARY_STUB_LATENCY", "0.05")),
+        jitter=float(os.environ.get("DICTIONARY_STUB_JITTER", "0.05")),
+        failure_rate=float(os.environ.get("DICTIONARY_STUB_FAILURE_RATE", "0")),
+    )
+
+
+def _deepl_provider():
+    key = os.environ.get("DEEPL_API_KEY")
+    return DeepTranslatorProvider("deepl", "DeeplTranslator", api_key=key, use_free_api=key.endswith(":fx")) if key else None
+
+
+# name -> factory; a factory returning None means the provider isn't configured
+KNOWN_PROVIDERS = {
+    "google": lambda: DeepTranslatorProvider("google", "GoogleTranslator"),
+    "mymemory": lambda: DeepTranslatorProvider("mymemory", "MyMemoryTranslator", codes={"en": "en-GB", "ja": "ja-JP"}),
+    "deepl": _deepl_provider,
+    "stub": _stub_provider,
+}
+
+# Providers in preference order until latency data says otherwise
+PROVIDERS = os.environ.get("DICTIONARY_PROVIDERS", "google,mymemory,deepl")
+
+
+def providers_from_env(spec: str = PROVIDERS) -> list:
+    providers = []
+    for name in spec.split(","):
+        factory = KNOWN_PROVIDERS.get(name.strip().lower())
+        provider = factory() if factory else None
+        if provider is not None:
+            providers.append(provider)
+    return providers
+
+
+# ──────────────────────────────────────────────
+# HEALTH: LATENCY STATS & CIRCUIT BREAKER
+# ──────────────────────────────────────────────
+# Recent calls kept per provider for percentiles and error rate
+STATS_WINDOW = 200
+# Assumed latency (s) of a provider without a successful call
+DEFAULT_LATENCY = 1.0
+# Calls slower than this multiple of the median count as spikes, not normal latency
+SPIKE_FACTOR = 3.0
+
+
+class ProviderStats:
+    """Rolling latency and error counts of one provider."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.hedge_wins = 0  # hedged duplicates that answered first
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.calls += 1
+            self.errors += not ok
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(latency)
+
+    def percentile(self, q: float):
+        """Latency at quantile `q` of recent successful calls, or None without data."""
+        with self._lock:
+            values = sorted(self._latencies)
+        return values[int(q * (len(values) - 1))] if values else None
+
+    def healthy_percentile(self, q: float):
+        """
+        Like percentile(), over calls within SPIKE_FACTOR x the median only. If
+        spikes are 5% of calls or more the plain p95 is a spike itself, and a
+        hedge timed on it would fire too late to help.
+        """
+        with self._lock:
+            values = sorted(self._latencies)
+        if not values:
+            return None
+        cutoff = values[len(values) // 2] * SPIKE_FACTOR
+        healthy = [v for v in values if v <= cutoff]
+        return healthy[int(q * (len(healthy) - 1))]
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    def expected_latency(self) -> float:
+        """Median latency inflated by the failure rate (time to a successful answer); 0 while untried."""
+        if not self.calls:
+            return 0.0
+        p50 = self.percentile(0.5)
+        return (DEFAULT_LATENCY if p50 is None else p50) / max(1 - self.error_rate, 0.1)
+
+
+# Consecutive failures that open a provider's circuit, and seconds it stays open
+FAILURE_THRESHOLD = 5
+COOLDOWN = 30.0
+
+
+class CircuitBreaker:
+    """
+    Closed: calls flow. Open after `failure_threshold` consecutive failures:
+    the provider is skipped. After `cooldown` it is half-open: calls are let
+    through again and the first failure re-opens it, a success closes it.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allows(self) -> bool:
+        return self.state != "open"
+
+    def record(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+
+
+# ──────────────────────────────────────────────
+# ROUTER
+# ──────────────────────────────────────────────
+# Never hedge sooner than this (s), whatever the p95 says
+MIN_HEDGE_DELAY = 0.05
+
+
+class ProviderRouter:
+    """
+    Sends each call to the provider with the lowest expected latency. If it
+    hasn't answered within the p95 of its healthy (non-spike) calls, a
+    duplicate goes to the next provider
+    and the first answer wins; a failure fails over to the next one. Providers
+    whose circuit is open are skipped until their cooldown ends. Successful
+    calls are metered against the caller's job and user.
+    """
+
+    def __init__(self, providers, hedge_quantile=0.95):
+        self.providers = list(providers)
+        self.hedge_quantile = hedge_quantile
+        self.health = {p.name: (ProviderStats(), CircuitBreaker()) for p in self.providers}
+        self.hedges = 0
+        self.failovers = 0
+        # Attempts run here so a slow loser never holds a scheduler worker
+        self._pool = ThreadPoolExecutor(max_workers=2 * MAX_BACKEND_CALLS, thread_name_prefix="provider")
+
+    def ranked(self) -> list:
+        """
+        Providers that may be called now: those with latency data and a closed
+        circuit, fastest expected first, then the rest (untried, half-open) in
+        configured order.
+        """
+        def key(item):
+            order, p = item
+            stats, breaker = self.health[p.name]
+            if stats.percentile(0.5) is not None and breaker.state == "closed":
+                return 0, stats.expected_latency()
+            return 1, order
+
+        available = [(i, p) for i, p in enumerate(self.providers) if self.health[p.name][1].allows()]
+        return [p for _, p in sorted(available, key=key)]
+
+    def _hedge_delay(self, provider) -> float:
+        p95 = self.health[provider.name][0].healthy_percentile(self.hedge_quantile)
+        return max(MIN_HEDGE_DELAY, DEFAULT_LATENCY if p95 is None else p95)
+
+    def _attempt(self, provider, text, source, target):
+        stats, breaker = self.health[provider.name]
+        start = time.perf_counter()
+        try:
+            result = provider.translate(text, source, target)
+        except Exception:
+            stats.record(time.perf_counter() - start, False)
+            breaker.record(False)
+            raise
+        stats.record(time.perf_counter() - start, True)
+        breaker.record(True)
+        get_meter().record(provider.name, len(text))
+        return result
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        try:
+            get_meter().check()
+        except BudgetExceeded as e:
+            raise ProvidersUnavailable(str(e)) from e
+        candidates = self.ranked()
+        if not candidates:
+            raise ProvidersUnavailable("every provider's circuit is open")
+        pending = {}
+        errors = []
+        launched = 0
+
+        def launch():
+            nonlocal launched
+            provider = candidates[launched]
+            launched += 1
+            pending[run_in_context(self._pool, self._attempt, provider, text, source, target)] = provider
+
+        launch()
+        hedge_at = time.monotonic() + self._hedge_delay(candidates[0])
+        hedged = False
+        while pending:
+            timeout = max(0.0, hedge_at - time.monotonic()) if not hedged and launched < len(candidates) else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # The primary is past its healthy p95: race one duplicate on the next provider
+                self.hedges += 1
+                hedged = True
+                launch()
+                continue
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e}")
+                    continue
+                if hedged and provider is not candidates[0]:
+                    self.health[provider.name][0].hedge_wins += 1
+                return result
+            if not pending and launched < len(candidates):
+                self.failovers += 1
+                launch()
+        raise ProvidersUnavailable("; ".join(errors))
+
+    def expected_latency(self) -> float:
+        """Expected seconds per call on the best available provider (for job estimates)."""
+        estimates = [self.health[p.name][0].expected_latency() for p in self.ranked()]
+        measured = [e for e in estimates if e > 0]
+        return min(measured) if measured else DEFAULT_LATENCY
+
+    def snapshot(self) -> list:
+        """Per-provider health rows for monitoring."""
+        billed = get_meter().snapshot()["by_provider"]
+        rows = []
+        for p in self.providers:
+            stats, breaker = self.health[p.name]
+            p50, p95 = stats.percentile(0.5), stats.percentile(0.95)
+            rows.append({
+                "Provider": p.name,
+                "Circuit": breaker.state,
+                "Calls": stats.calls,
+                "Error rate": round(stats.error_rate, 3),
+                "p50 (ms)": None if p50 is None else round(p50 * 1000),
+                "p95 (ms)": None if p95 is None else round(p95 * 1000),
+                "Hedge wins": stats.hedge_wins,
+                "Trips": breaker.trips,
+                "Characters": billed.get(p.name, 0),
+            })
+        return rows
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> ProviderRouter:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ProviderRouter(providers_from_env())
+        return _router
+
+
+def set_providers(providers) -> ProviderRouter:
+    """Replaces the process-wide router (stub providers for tests and load runs)."""
+    global _router
+    with _router_lock:
+        _router = ProviderRouter(providers)
+        return _router
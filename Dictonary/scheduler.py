@@ -0,0 +1,211 @@
+"""
+Process-wide scheduler for translation backend calls shared by all sessions.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import contextvars
+import functools
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future
+from contextlib import contextmanager
+
+# Priority classes, most urgent first
+INTERACTIVE = 0  # Smart Translator text
+BULK = 1         # document jobs
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Backend requests in flight at once, across every session
+MAX_BACKEND_CALLS = 8
+
+_traffic = contextvars.ContextVar("traffic", default=("anonymous", BULK))
+_scope = contextvars.ContextVar("call_scope", default=None)
+
+
+@contextmanager
+def traffic(user: str, priority: int):
+    """Tags backend calls made in this context (and in tasks it submits) with a user and class."""
+    token = _traffic.set((user, priority))
+    try:
+        yield
+    finally:
+        _traffic.reset(token)
+
+
+def current_traffic():
+    """(user, priority) of the running context."""
+    return _traffic.get()
+
+
+class CallScope:
+    """
+    Groups the backend calls made by one job so they can be withdrawn
+    together (BackendScheduler.withdraw) when nobody wants the results any more.
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.withdrawn = False
+
+    def run(self, fn, *args):
+        """Runs `fn(*args)` with its backend calls counted in this scope."""
+        token = _scope.set(self)
+        try:
+            return fn(*args)
+        finally:
+            _scope.reset(token)
+
+
+class BackendScheduler:
+    """
+    Owns all backend traffic. Calls queue per priority class and, within a
+    class, per user; workers serve the most urgent class first and rotate
+    between its users, so one large upload can't starve everyone else.
+    Identical requests already queued or running share one call.
+    """
+
+    def __init__(self, workers: int = MAX_BACKEND_CALLS):
+        self._cond = threading.Condition()
+        # priority -> OrderedDict(user -> deque of (key, fn, future)); order = round-robin turn
+        self._queues = {p: OrderedDict() for p in PRIORITIES}
+        # key -> [future, priority, scopes still waiting for it (None = a caller outside any scope)]
+        self._inflight = {}
+        self.deduplicated = 0
+        self._threads = [
+            threading.Thread(target=self._work, name=f"backend-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, key, fn, user=None, priority=None) -> Future:
+        """
+        Schedules `fn()`, run in the caller's context (its traffic and metering
+        tags); returns the Future of an identical pending call if there is one.
+        Raises CancelledError if the caller's CallScope was already withdrawn.
+        """
+        scope = _scope.get()
+        if user is None or priority is None:
+            ctx_user, ctx_priority = current_traffic()
+            user = ctx_user if user is None else user
+            priority = ctx_priority if priority is None else priority
+        with self._cond:
+            if scope is not None:
+                if scope.withdrawn:
+                    raise CancelledError()
+                scope.keys.add(key)
+            shared = self._inflight.get(key)
+            if shared is not None:
+                self.deduplicated += 1
+                shared[2].append(scope)
+                if priority < shared[1]:
+                    self._promote(key, priority)
+                return shared[0]
+            future = Future()
+            self._inflight[key] = [future, priority, [scope]]
+            run = functools.partial(contextvars.copy_context().run, fn)
+            self._queues[priority].setdefault(user, deque()).append((key, run, future))
+            self._cond.notify()
+            return future
+
+    def call(self, key, fn, user=None, priority=None):
+        """Runs `fn()` through the scheduler and waits for its result."""
+        return self.submit(key, fn, user, priority).result()
+
+    def _promote(self, key, priority):
+        """Moves a queued bulk call into a more urgent class when an interactive user needs it too."""
+        for p in PRIORITIES:
+            for user, queue in self._queues[p].items():
+                for item in queue:
+                    if item[0] == key:
+                        queue.remove(item)
+                        if not queue:
+                            del self._queues[p][user]
+                        self._queues[priority].setdefault(user, deque()).append(item)
+                        self._inflight[key][1] = priority
+                        return
+
+    def withdraw(self, scope: CallScope) -> int:
+        """
+        Drops the queued calls that only `scope` was waiting for; their
+        futures are cancelled. Calls already running at a provider finish,
+        and later submits from the scope raise CancelledError. Returns the
+        number of calls dropped.
+        """
+        dropped = 0
+        with self._cond:
+            scope.withdrawn = True
+            for key in scope.keys:
+                entry = self._inflight.get(key)
+                if entry is None:
+                    continue
+                future, _, waiting = entry
+                waiting[:] = [s for s in waiting if s is not scope]
+                if waiting or future.running():
+                    continue
+                for users in self._queues.values():
+                    for user, queue in list(users.items()):
+                        for item in queue:
+                            if item[0] == key:
+                                queue.remove(item)
+                                if not queue:
+                                    del users[user]
+                                break
+                del self._inflight[key]
+                future.cancel()
+                dropped += 1
+            scope.keys.clear()
+        return dropped
+
+    def _next(self):
+        for p in PRIORITIES:
+            users = self._queues[p]
+            if users:
+                user, queue = next(iter(users.items()))
+                item = queue.popleft()
+                # This user's turn is over: go to the back of the line
+                del users[user]
+                if queue:
+                    users[user] = queue
+                return item
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                item = self._next()
+                while item is None:
+                    self._cond.wait()
+                    item = self._next()
+            key, fn, future = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn())
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._cond:
+                # A withdrawn key may already have been submitted again
+                if self._inflight.get(key, (None,))[0] is future:
+                    del self._inflight[key]
+
+    def pending(self) -> dict:
+        """Queued calls per priority class."""
+        with self._cond:
+            return {p: sum(len(q) for q in users.values()) for p, users in self._queues.items()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> BackendScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BackendScheduler()
+        return _scheduler
+
+
+def run_in_context(executor, fn, *args):
+    """executor.submit that carries the caller's traffic tag into the worker thread."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
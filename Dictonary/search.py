@@ -0,0 +1,328 @@
+"""
+Dictionary search: precomputed row haystacks, debounced type-ahead narrowing
+and character n-gram similarity.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import os
+import threading
+import unicodedata
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import streamlit.components.v1 as components
+from scipy import sparse
+
+SEARCH_COLS = [
+    "Category",
+    "Category (Japanese)",
+    "Action (English)",
+    "Action (Japanese)",
+    "Activity (English)",
+    "Activity (Japanese)",
+]
+
+SUGGESTION_COLS = [
+    "Action (English)",
+    "Action (Japanese)",
+    "Activity (English)",
+    "Activity (Japanese)",
+]
+
+_FIELD_SEP = "\x1f"
+
+
+# ──────────────────────────────────────────────
+# SEARCH INDEX
+# ──────────────────────────────────────────────
+class SearchIndex:
+    """
+    One lowercased haystack string per catalog row, joined over SEARCH_COLS.
+    Queries are literal substring matches restricted to a candidate row set.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        text = df.fillna("").astype(str)
+        cols = [c for c in SEARCH_COLS if c in text.columns]
+        joined = text[cols[0]]
+        for col in cols[1:]:
+            joined = joined + _FIELD_SEP + text[col]
+        self.haystack = joined.str.lower().tolist()
+        self.fields = {c: text[c].tolist() for c in SUGGESTION_COLS if c in text.columns}
+
+    def __len__(self):
+        return len(self.haystack)
+
+    def updated(self, df: pd.DataFrame, reuse) -> "SearchIndex":
+        """
+        Index for `df` where `reuse[i]` is the position of an unchanged row in this
+        index (or None). Only new and changed rows are re-processed.
+        """
+        fresh = [i for i, old in enumerate(reuse) if old is None]
+        built = SearchIndex(df.iloc[fresh]) if fresh else None
+
+        index = SearchIndex.__new__(SearchIndex)
+        index.haystack = [self.haystack[old] if old is not None else None for old in reuse]
+        index.fields = {c: [vals[old] if old is not None else None for old in reuse] for c, vals in self.fields.items()}
+        if built is not None:
+            for j, i in enumerate(fresh):
+                index.haystack[i] = built.haystack[j]
+                for c in index.fields:
+                    index.fields[c][i] = built.fields[c][j]
+        return index
+
+    def find(self, query: str, candidates=None) -> np.ndarray:
+        """Row positions among `candidates` (default: all rows) whose fields contain `query`."""
+        q = query.strip().lower()
+        if candidates is None:
+            candidates = range(len(self.haystack))
+        if not q:
+            return np.asarray(candidates, dtype=np.int64)
+        hay = self.haystack
+        return np.fromiter((i for i in candidates if q in hay[i]), dtype=np.int64)
+
+    def suggest(self, query: str, positions, limit: int = 8) -> list:
+        """Distinct field values containing `query`, prefix matches first."""
+        q = query.strip().lower()
+        if not q:
+            return []
+        prefix, inner = [], []
+        seen = set()
+        for i in positions:
+            for values in self.fields.values():
+                val = values[i]
+                low = val.lower()
+                if not val or val in seen or q not in low:
+                    continue
+                seen.add(val)
+                (prefix if low.startswith(q) else inner).append(val)
+            if len(prefix) >= limit:
+                break
+        return (prefix + inner)[:limit]
+
+
+class TypeAhead:
+    """
+    Per-session search state. When a new query still contains the previous one
+    (the user kept typing), only the previous hits are rescanned.
+    """
+
+    def __init__(self, index: SearchIndex):
+        self.index = index
+        self.last_query = ""
+        self.last_scope = None
+        self.last_hits = None
+
+    def search(self, query: str, mask: np.ndarray) -> np.ndarray:
+        """Row positions matching `query` inside the category `mask`."""
+        q = query.strip().lower()
+        scope = mask.tobytes()
+        if self.last_hits is not None and scope == self.last_scope and self.last_query and self.last_query in q:
+            candidates = self.last_hits
+        else:
+            candidates = np.flatnonzero(mask)
+        hits = self.index.find(q, candidates) if q else candidates
+
+        self.last_query, self.last_scope, self.last_hits = q, scope, hits
+        return hits
+
+
+# ──────────────────────────────────────────────
+# SIMILARITY (CHARACTER N-GRAM TF-IDF)
+# ──────────────────────────────────────────────
+SIMILARITY_COLS = SUGGESTION_COLS
+NGRAM_SIZES = (2, 3)
+
+# Related rows are found through n-grams in at most this many rows (common ones
+# cost the most and say the least), then the best candidates are rescored exactly
+RELATED_MAX_DF = 1000
+RELATED_CANDIDATES = 30
+# Rows whose related rows are remembered per index version
+RELATED_CACHE_SIZE = 20000
+
+
+def _ngrams(text: str) -> Counter:
+    """Character 2/3-grams of a padded, width-folded, lowercased string (script-agnostic)."""
+    t = " " + " ".join(unicodedata.normalize("NFKC", text).lower().split()) + " "
+    return Counter(t[i:i + n] for n in NGRAM_SIZES for i in range(len(t) - n + 1))
+
+
+class SimilarityIndex:
+    """
+    TF-IDF vectors of character n-grams over the English and Japanese fields,
+    L2-normalized so a dot product is the cosine similarity. Rows are also
+    kept transposed (n-gram -> rows), so a query only touches the postings
+    of its own n-grams.
+    """
+
+    def __init__(self, df: pd.DataFrame, vocab=None, counts=None):
+        self.vocab = {} if vocab is None else vocab
+        if counts is None:
+            counts = self._count_rows(self._row_texts(df))
+        self.counts = counts
+        self._weigh()
+
+    @staticmethod
+    def _row_texts(df: pd.DataFrame) -> list:
+        text = df.fillna("").astype(str)
+        cols = [c for c in SIMILARITY_COLS if c in text.columns]
+        return [" ".join(vals) for vals in zip(*(text[c] for c in cols))] if cols else [""] * len(df)
+
+    def _count_rows(self, texts) -> sparse.csr_matrix:
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            for gram, n in _ngrams(text).items():
+                indices.append(self.vocab.setdefault(gram, len(self.vocab)))
+                data.append(n)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), len(self.vocab)),
+        )
+
+    def _weigh(self):
+        counts = self.counts
+        if counts.shape[1] < len(self.vocab):
+            counts.resize((counts.shape[0], len(self.vocab)))
+        n_rows = counts.shape[0]
+        doc_freq = np.bincount(counts.indices, minlength=len(self.vocab))
+        self.idf = (np.log((1 + n_rows) / (1 + doc_freq)) + 1).astype(np.float32)
+
+        matrix = counts.copy()
+        matrix.data = (1 + np.log(matrix.data)) * self.idf[matrix.indices]
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        self.matrix = sparse.diags(1 / norms).astype(np.float32) @ matrix
+        self.postings = self.matrix.T.tocsr()
+
+        # Candidate lookup for related(): the same vectors without the common n-grams
+        rare = np.flatnonzero(doc_freq <= RELATED_MAX_DF)
+        self._rare_matrix = self.matrix[:, rare].tocsr()
+        self._rare_postings = self.postings[rare]
+        self._related = {}
+        self._related_lock = threading.Lock()
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    def updated(self, df: pd.DataFrame, reuse) -> "SimilarityIndex":
+        """Index for `df`, re-counting only rows without a `reuse` position (see SearchIndex.updated)."""
+        vocab = dict(self.vocab)
+        index = SimilarityIndex.__new__(SimilarityIndex)
+        index.vocab = vocab
+        fresh = [i for i, old in enumerate(reuse) if old is None]
+        new_counts = index._count_rows(self._row_texts(df.iloc[fresh])) if fresh else None
+
+        old_counts = self.counts.copy()
+        old_counts.resize((old_counts.shape[0], len(vocab)))
+        kept = [i for i, old in enumerate(reuse) if old is not None]
+        parts = [old_counts[[reuse[i] for i in kept]]]
+        if new_counts is not None:
+            new_counts.resize((new_counts.shape[0], len(vocab)))
+            parts.append(new_counts)
+        # Reused rows come first in `parts`; put every row back at its position in `df`
+        order = np.empty(len(reuse), dtype=np.int64)
+        order[kept] = np.arange(len(kept))
+        order[fresh] = len(kept) + np.arange(len(fresh))
+        index.counts = sparse.vstack(parts, format="csr")[order]
+        index._weigh()
+        return index
+
+    def _query_scores(self, text: str) -> np.ndarray:
+        grams = _ngrams(text)
+        ids = [self.vocab[g] for g in grams if g in self.vocab]
+        if not ids:
+            return np.zeros(len(self), dtype=np.float32)
+        weights = np.array([1 + np.log(grams[g]) for g in grams if g in self.vocab], dtype=np.float32) * self.idf[ids]
+        weights /= np.linalg.norm(weights)
+        # One sparse product over the query's posting lists
+        return self.postings[ids].T @ weights
+
+    @staticmethod
+    def _top(rows: np.ndarray, scores: np.ndarray, k: int, min_score: float) -> list:
+        keep = scores >= min_score
+        rows, scores = rows[keep], scores[keep]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    def search(self, text: str, k: int = 5, min_score: float = 0.2, mask=None) -> list:
+        """(row, cosine similarity) of the `k` rows closest to `text`, optionally within a row mask."""
+        scores = self._query_scores(text)
+        if mask is not None:
+            scores = np.where(mask, scores, 0)
+        return self._top(np.arange(len(scores)), scores, k, min_score)
+
+    def related(self, rows, k: int = 3, min_score: float = 0.2) -> list:
+        """
+        For each of `rows`, its `k` most similar other rows. Candidates come from
+        the rows' uncommon n-grams; the best RELATED_CANDIDATES of each are
+        rescored with the full vectors. Results are cached per row.
+        """
+        rows = [int(r) for r in rows]
+        with self._related_lock:
+            cached = {r: self._related.get((r, k, min_score)) for r in rows}
+        todo = np.asarray([r for r in dict.fromkeys(rows) if cached[r] is None], dtype=np.int64)
+        if len(todo):
+            cached.update(zip(todo.tolist(), self._compute_related(todo, k, min_score)))
+            with self._related_lock:
+                if len(self._related) + len(todo) > RELATED_CACHE_SIZE:
+                    self._related.clear()
+                self._related.update(((r, k, min_score), cached[r]) for r in todo.tolist())
+        return [cached[r] for r in rows]
+
+    def _compute_related(self, rows: np.ndarray, k: int, min_score: float) -> list:
+        approx = (self._rare_matrix[rows] @ self._rare_postings).tocsr()
+        pair_rows, pair_cols = [], []
+        for j, row in enumerate(rows):
+            start, end = approx.indptr[j], approx.indptr[j + 1]
+            cols, vals = approx.indices[start:end], approx.data[start:end]
+            other = cols != row
+            cols, vals = cols[other], vals[other]
+            if len(cols) > RELATED_CANDIDATES:
+                cols = cols[np.argpartition(-vals, RELATED_CANDIDATES - 1)[:RELATED_CANDIDATES]]
+            pair_rows.append(np.full(len(cols), j))
+            pair_cols.append(cols)
+        pair_rows = np.concatenate(pair_rows)
+        pair_cols = np.concatenate(pair_cols)
+        # Exact cosine of every (row, candidate) pair in one element-wise product
+        scores = np.asarray(self.matrix[rows[pair_rows]].multiply(self.matrix[pair_cols]).sum(axis=1)).ravel()
+        bounds = np.searchsorted(pair_rows, np.arange(len(rows) + 1))
+        return [self._top(pair_cols[a:b], scores[a:b], k, min_score) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def term_label(row) -> str:
+    """Short "English · Japanese" name of a catalog row (Action, falling back to Activity)."""
+    parts = []
+    for lang in ("English", "Japanese"):
+        value = row.get(f"Action ({lang})") or row.get(f"Activity ({lang})") or ""
+        if value and value not in parts:
+            parts.append(value)
+    return " · ".join(parts)
+
+
+# ──────────────────────────────────────────────
+# DEBOUNCED INPUT COMPONENT
+# ──────────────────────────────────────────────
+_typeahead_component = components.declare_component(
+    "typeahead_input",
+    path=os.path.join(os.path.dirname(__file__), "components", "typeahead"),
+)
+
+
+def typeahead_input(key, placeholder="", suggestions=None, debounce_ms=150):
+    """
+    Text box that reports its value while the user types (debounced in the browser)
+    and lists `suggestions` under the input. Returns the current query string.
+    """
+    value = _typeahead_component(
+        placeholder=placeholder,
+        suggestions=suggestions or [],
+        debounce_ms=debounce_ms,
+        key=key,
+        default="",
+    )
+    return value or ""
@@ -0,0 +1,183 @@
+"""
+Segment preparation for translation: normalization and affix handling.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import re
+import unicodedata
+
+
+# ──────────────────────────────────────────────
+# NORMALIZATION
+# ──────────────────────────────────────────────
+_WHITESPACE = re.compile(r"\s+")
+
+# Bullets / list markers kept in front of a segment, untranslated
+_LEAD = re.compile(r"^[\s・•●○■□◆◇▪▶►※*\-–—>#]*")
+# Sentence punctuation kept after a segment (mapped to the target script)
+_TRAIL = re.compile(r"[\s.,:;!?。、，．：；！？…]*$")
+
+TRAIL_PUNCT = {
+    "En_to_Jp": str.maketrans({".": "。", ",": "、", ":": "：", ";": "；", "!": "！", "?": "？"}),
+    "Jp_to_En": str.maketrans({"。": ".", "、": ",", "，": ",", "．": ".", "：": ":", "；": ";", "！": "!", "？": "?"}),
+}
+
+
+def normalize_text(text: str) -> str:
+    """NFKC width folding + whitespace collapsing. Used as the translation memory key."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def split_affixes(text: str):
+    """
+    Splits a segment into (lead, core, trail): leading whitespace/bullets,
+    the translatable core, and trailing whitespace/sentence punctuation.
+    """
+    lead = _LEAD.match(text).group(0)
+    rest = text[len(lead):]
+    trail = _TRAIL.search(rest).group(0)
+    core = rest[:len(rest) - len(trail)]
+    return lead, core, trail
+
+
+def restore_affixes(lead: str, translated: str, trail: str, direction: str) -> str:
+    """Re-applies the original surroundings, converting sentence punctuation for the target language."""
+    return lead + translated + trail.translate(TRAIL_PUNCT[direction])
+
+
+# ──────────────────────────────────────────────
+# UNTRANSLATABLE SEGMENTS
+# ──────────────────────────────────────────────
+_JA_CHARS = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f]")
+_LATIN_CHARS = re.compile(r"[A-Za-z\uff21-\uff3a\uff41-\uff5a]")
+# Quoted dictionary terms don't say anything about the language of the sentence around them
+_QUOTED = re.compile(r"「[^」]*」|『[^』]*』|\"[^\"]*\"")
+# Quoted glossary terms, which the translator pins to their official rendering
+QUOTED_TERM = re.compile(r"\"([^\"]+)\"|'([^']+)'|「([^」]+)」|『([^』]+)』")
+
+# Share of Japanese letters above which a segment counts as Japanese
+JA_RATIO_THRESHOLD = 0.3
+
+SKIP_PATTERNS = {
+    "formula": re.compile(r"^=\S"),
+    "url": re.compile(r"^(?:(?:https?|ftp)://|www\.)\S+$", re.I),
+    "email": re.compile(r"^[\w.+-]+@[\w-]+(?:\.[\w-]+)+$"),
+    "path": re.compile(r"^(?:[A-Za-z]:[\\/]|\\\\\S|~?/\S+/)\S*$"),
+    "date": re.compile(
+        r"^(?:\d{4}[-/.年]\d{1,2}[-/.月]\d{1,2}日?|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4})"
+        r"(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?$|^\d{1,2}:\d{2}(?::\d{2})?$"
+    ),
+    "number": re.compile(r"^[^\w]*[\d\s.,:/+\-−%¥$€£円]*[^\w]*$"),
+    "code": re.compile(r"^(?=\S*\d)[A-Za-z0-9]+(?:[-_./:#][A-Za-z0-9]+)*$"),
+}
+
+# Checked in this order; the first match names the reason
+SKIP_RULES = ("formula", "url", "email", "path", "date", "number", "code", "target_script")
+
+
+def script_counts(text: str):
+    """(Japanese letters, Latin letters) outside quoted terms."""
+    text = _QUOTED.sub(" ", text)
+    return len(_JA_CHARS.findall(text)), len(_LATIN_CHARS.findall(text))
+
+
+def is_japanese(text: str) -> bool:
+    ja, latin = script_counts(text)
+    return ja > 0 and ja / (ja + latin) >= JA_RATIO_THRESHOLD
+
+
+def detect_direction(text: str):
+    """
+    Translation direction for one segment from its letter statistics (no network):
+    "Jp_to_En" for Japanese, "En_to_Jp" for Latin text, None if it has neither.
+    """
+    ja, latin = script_counts(text)
+    if not ja and not latin:
+        return None
+    return "Jp_to_En" if ja / (ja + latin) >= JA_RATIO_THRESHOLD else "En_to_Jp"
+
+
+def skip_reason(text: str, direction: str, rules=SKIP_RULES):
+    """Name of the first rule saying `text` should pass through untranslated, else None."""
+    text = text.strip()
+    for rule in rules:
+        if rule == "target_script":
+            # Only meaningful once a direction is fixed
+            if direction in TRAIL_PUNCT and is_japanese(text) == (direction == "En_to_Jp"):
+                return rule
+        elif SKIP_PATTERNS[rule].match(text):
+            return rule
+    return None
+
+
+# ──────────────────────────────────────────────
+# SENTENCE SEGMENTATION
+# ──────────────────────────────────────────────
+# Quoted dictionary terms and [IDn] placeholders are never split
+_PROTECTED = re.compile(r'"[^"\n]*"|「[^」]*」|『[^』]*』|\[ID\d+\]')
+_BOUNDARY = re.compile(
+    r"[。！？]+[」』）)]*[ \t　]*"             # Japanese: no space needed after
+    r"|[.!?]+[\"')\]]*[ \t]+(?=\S)"               # English: punctuation + space
+    r"|[ \t]*\n[\s]*"                              # line breaks
+)
+# Lowercase abbreviations in any case, titles as written, dotted initialisms ("U.S.")
+_ABBREVIATION = re.compile(r"(?:\b(?i:e\.g|i\.e|etc|vs|approx)|\b(?:Mr|Mrs|Ms|Dr|Ver|Fig|Inc|Ltd)|\b(?:[A-Z]\.)+[A-Z])\.$")
+# "No." only abbreviates "number" right before one ("No. 5"); otherwise it ends the sentence
+_NUMBER_SIGN = re.compile(r"\bNo\.$", re.I)
+
+# Backends reject very long requests; longer sentences are cut at a space
+MAX_SEGMENT_CHARS = 4500
+
+
+def _cut_long(piece: str, limit: int) -> list:
+    out = []
+    while len(piece) > limit:
+        cut = max(piece.rfind(" ", 0, limit), piece.rfind("、", 0, limit), piece.rfind(",", 0, limit))
+        cut = cut + 1 if cut > 0 else limit
+        out.append(piece[:cut])
+        piece = piece[cut:]
+    out.append(piece)
+    return out
+
+
+def split_sentences(text: str, max_chars: int = MAX_SEGMENT_CHARS) -> list:
+    """
+    Splits bilingual text into sentences. Each piece keeps its trailing
+    punctuation and whitespace, so "".join(pieces) == text.
+    """
+    protected = [m.span() for m in _PROTECTED.finditer(text)]
+    pieces = []
+    start = 0
+    for m in _BOUNDARY.finditer(text):
+        pos = m.start()
+        if any(a < pos < b for a, b in protected):
+            continue
+        if text[pos] == "." and _ABBREVIATION.search(text[start:pos + 1]):
+            continue
+        if text[pos] == "." and _NUMBER_SIGN.search(text[start:pos + 1]) and text[m.end():m.end() + 1].isdigit():
+            continue
+        if m.end() > start:
+            pieces.append(text[start:m.end()])
+            start = m.end()
+    if start < len(text):
+        pieces.append(text[start:])
+
+    if any(len(p) > max_chars for p in pieces):
+        pieces = [part for p in pieces for part in _cut_long(p, max_chars)]
+    return pieces or [text]
+
+
+def join_sentences(pieces, direction: str) -> str:
+    """Joins translated sentences with the spacing conventions of the target language."""
+    out = []
+    for i, piece in enumerate(pieces):
+        last = i == len(pieces) - 1
+        if direction == "En_to_Jp":
+            # Japanese sentences follow each other without spaces
+            stripped = piece.rstrip(" \t")
+            if not last and stripped.endswith(("。", "！", "？")):
+                piece = stripped
+        elif not last and piece[-1:] in ".!?\"')" and pieces[i + 1][:1] not in ("", " ", "\n"):
+            piece += " "
+        out.append(piece)
+    return "".join(out)
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from catalog import REQUIRED_COLS, CatalogSnapshot, diff_catalogs, merge_catalogs, row_keys
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=REQUIRED_COLS)
+
+
+OLD = frame([
+    ["File", "ファイル", "Open", "開く", "Open File", "ファイルを開く"],
+    ["File", "ファイル", "Close", "閉じる", "Close File", "ファイルを閉じる"],
+    ["Browser", "ブラウザ", "Click", "クリック", "Click Element", "要素をクリック"],
+    ["Excel", "エクセル", "Read", "読み込む", "Read Range", "範囲を読み込む"],
+])
+
+NEW = frame([
+    ["File", "ファイル", "Open", "開く", "Open File", "ファイルを開く"],
+    ["Browser", "ブラウザ", "Click", "クリック", "Click Element", "要素をクリックする"],
+    ["Excel", "エクセル", "Read", "読み込む", "Read Range", "範囲を読み込む"],
+    ["Excel", "エクセル", "Write", "書き込む", "Write Range", "範囲に書き込む"],
+])
+
+
+def test_incremental_reload_matches_full_rebuild():
+    old = CatalogSnapshot.build(OLD)
+    new_keys = row_keys(NEW)
+    applied = old.applied(NEW, new_keys, diff_catalogs(OLD, NEW, old.keys, new_keys))
+    full = CatalogSnapshot.build(applied.df)
+
+    assert applied.keys == full.keys
+    assert applied.facets.counts == full.facets.counts
+    assert applied.search_index.haystack == full.search_index.haystack
+    assert applied.search_index.fields == full.search_index.fields
+    assert applied.glossary.maps == full.glossary.maps
+    for query in ("range", "file", "クリック"):
+        got = applied.similarity.search(query, k=4, min_score=0.0)
+        want = full.similarity.search(query, k=4, min_score=0.0)
+        assert [r for r, _ in got] == [r for r, _ in want]
+        assert [round(s, 5) for _, s in got] == [round(s, 5) for _, s in want]
+
+
+def test_glossary_ignores_empty_targets_and_split_votes():
+    df = frame([
+        ["HTTP", "HTTP", "", "", "Post", ""],
+        ["HTTP", "HTTP", "", "", "Delete", ""],
+        ["File", "ファイル", "", "", "Delete", "削除"],
+        ["Printer", "プリンター", "", "", "Delete", "削除"],
+        ["Browser", "ブラウザ", "", "", "Close", "ブラウザを閉じる"],
+        ["Window", "ウィンドウ", "", "", "Close", "閉じる"],
+    ])
+    glossary = CatalogSnapshot.build(df).glossary
+
+    assert glossary.resolve("Post", "En_to_Jp") is None
+    assert glossary.resolve("Delete", "En_to_Jp") == "削除"
+    assert glossary.resolve("Close", "En_to_Jp") is None
+    assert "post" not in glossary.lookup_map("En_to_Jp")
+
+
+def test_later_glossary_overrides_earlier_majority():
+    primary = frame([
+        ["File", "ファイル", "", "", "Open", "開く"],
+        ["Browser", "ブラウザ", "", "", "Open", "開く"],
+        ["Excel", "エクセル", "", "", "Read", "読み込む"],
+    ])
+    team = frame([["Mail", "メール", "", "", "Open", "オープン"]])
+    snapshot = CatalogSnapshot.build(merge_catalogs([primary, team]))
+
+    assert snapshot.glossary.lookup_map("En_to_Jp")["open"] == "オープン"
+    assert snapshot.glossary.resolve("Read", "En_to_Jp") == "読み込む"
+    assert "_layer" not in snapshot.df.columns
+
+
+def test_cross_glossary_tie_goes_to_later_glossary():
+    primary = frame([["File", "ファイル", "", "", "Open", "開く"]])
+    team = frame([["Mail", "メール", "", "", "Open", "オープン"]])
+    glossary = CatalogSnapshot.build(merge_catalogs([primary, team])).glossary
+
+    assert glossary.lookup_map("En_to_Jp").get("open") == "オープン"
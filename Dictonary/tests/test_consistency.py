@@ -0,0 +1,22 @@
+from catalog import Glossary
+from consistency import check_pairs
+
+GLOSSARY = Glossary({
+    "En_to_Jp": {"open": "開く", "close file": "ファイルを閉じる", "file": "ファイル"},
+    "Jp_to_En": {},
+})
+
+
+def test_pinned_and_multi_word_terms_are_checked():
+    pairs = [
+        ("Open the file and close it.", "それを開いて閉じます。"),
+        ('Use "Close File" at the end.', "最後にファイルを閉じるを使います。"),
+        ("Close File", "ファイルを閉じる"),
+        ("Open / Close File", "開く / 閉じる"),
+        ("Save, then close file quickly.", "保存してから、ファイルを閉じるをすぐに実行します。"),
+    ]
+    report = check_pairs(pairs, GLOSSARY, "En_to_Jp")
+
+    assert report.expected == 5
+    assert report.found == 4
+    assert [miss[:2] for miss in report.misses] == [("close file", "ファイルを閉じる")]
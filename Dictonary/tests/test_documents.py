@@ -0,0 +1,80 @@
+import io
+import zipfile
+
+import openpyxl
+import pytest
+
+from catalog import Glossary
+from documents import BatchTranslation, MemoryMeter, PreviousTranslation, expand_uploads
+from providers import StubProvider, set_providers
+
+
+@pytest.fixture
+def stub_backend():
+    set_providers([StubProvider(latency=0.001, output=lambda text, source, target: f"訳:{text}")])
+    yield
+    set_providers([])
+
+
+def workbook(n_rows):
+    wb = openpyxl.Workbook()
+    for i in range(n_rows):
+        wb.active.cell(row=i + 1, column=1, value=f"Open the report number {i} and copy it.")
+        wb.active.cell(row=i + 1, column=2, value="Close File")
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_concurrent_batch_with_verify(stub_backend):
+    glossary = Glossary({"En_to_Jp": {"close file": "ファイルを閉じる"}, "Jp_to_En": {}})
+    items = [(f"sheet{i}.xlsx", workbook(40)) for i in range(8)]
+
+    batch = BatchTranslation(items, glossary, "En_to_Jp", verify=True)
+    archive = zipfile.ZipFile(batch.finish())
+
+    assert batch.errors == {}
+    assert len(archive.namelist()) == len(items)
+    for report in batch.reports:
+        assert report.consistency is not None
+        assert report.peak_memory >= 0
+    ws = openpyxl.load_workbook(archive.open(archive.namelist()[0])).active
+    assert ws.cell(row=1, column=2).value == "ファイルを閉じる"
+
+
+def test_memory_meter_sees_allocations():
+    with MemoryMeter() as meter:
+        block = bytearray(64 * 2**20)
+        block[::4096] = b"x" * len(block[::4096])
+    assert meter.baseline is None or meter.peak >= 32 * 2**20
+
+
+def test_previous_translation_keeps_hand_edits_by_position():
+    source = [("p0", "Intro", None), ("p1", "Total", None), ("p2", "Body", None), ("p3", "Total", None), ("p4", "End", None)]
+    translated = [("p0", "序論", None), ("p1", "合計", None), ("p2", "本文", None), ("p3", "総計", None), ("p4", "終わり", None)]
+    previous = PreviousTranslation(source, translated)
+
+    # A paragraph inserted at the top shifts every key
+    units = [("n0", "New", None)] + [(f"n{i + 1}", text, None) for i, (_, text, _) in enumerate(source)]
+    reuse = previous.align(units)
+
+    assert "n0" not in reuse
+    assert [reuse[f"n{i}"] for i in range(1, 6)] == ["序論", "合計", "本文", "総計", "終わり"]
+
+
+def test_same_member_path_in_two_archives_gets_distinct_entries(stub_backend):
+    glossary = Glossary({"En_to_Jp": {}, "Jp_to_En": {}})
+    uploads = []
+    for archive_name in ("q1.zip", "q2.zip"):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("reports/sheet.xlsx", workbook(2).getvalue())
+        buffer.seek(0)
+        buffer.name = archive_name
+        uploads.append(buffer)
+    items = expand_uploads(uploads) + [("q1/reports/sheet.xlsx", workbook(2))]
+
+    names = zipfile.ZipFile(BatchTranslation(items, glossary, "En_to_Jp").finish()).namelist()
+
+    assert sorted(names) == ["q1/reports/Translated_sheet (2).xlsx", "q1/reports/Translated_sheet.xlsx", "q2/reports/Translated_sheet.xlsx"]
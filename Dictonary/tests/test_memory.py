@@ -0,0 +1,32 @@
+import pandas as pd
+
+from catalog import REQUIRED_COLS
+from memory import TranslationMemory, entries_from_catalog
+
+
+def test_memory_evicts_least_recently_used():
+    memory = TranslationMemory(max_entries=2)
+    memory[("En_to_Jp", "a")] = "あ"
+    memory[("En_to_Jp", "b")] = "び"
+    assert memory.get(("En_to_Jp", "a")) == "あ"
+
+    memory[("En_to_Jp", "c")] = "し"
+    assert memory.update([(("En_to_Jp", "d"), "で"), (("En_to_Jp", "c"), "し")]) == 1
+
+    assert len(memory) == 2
+    assert ("En_to_Jp", "c") in memory and ("En_to_Jp", "d") in memory
+    assert memory.evictions == 2
+
+
+def test_catalog_entries_skip_ambiguous_terms():
+    df = pd.DataFrame([
+        ["Mail", "メール", "", "", "Log on", "ログオン"],
+        ["Windows", "ウィンドウズ", "", "", "Log on", "サインイン"],
+        ["File", "ファイル", "", "", "Read File", "ファイルを読み込む"],
+    ], columns=REQUIRED_COLS)
+
+    entries = dict(entries_from_catalog(df))
+
+    assert ("En_to_Jp", "log on") not in entries
+    assert entries[("En_to_Jp", "read file")] == "ファイルを読み込む"
+    assert entries[("Jp_to_En", "ログオン")] == entries[("Jp_to_En", "サインイン")] == "Log on"
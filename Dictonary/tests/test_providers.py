@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from providers import CircuitBreaker, ProviderRouter, ProvidersUnavailable, ProviderStats, StubProvider
+
+
+def test_hedge_delay_ignores_frequent_spikes():
+    stats = ProviderStats()
+    for i in range(200):
+        stats.record(1.0 if i % 10 == 0 else 0.01 + i / 100000, True)
+
+    assert stats.percentile(0.95) == 1.0
+    assert stats.healthy_percentile(0.95) < 0.02
+
+
+def test_untried_providers_keep_configured_order():
+    first, second, third = (StubProvider(name) for name in ("google", "mymemory", "deepl"))
+    router = ProviderRouter([first, second, third])
+    router.translate("Open", "en", "ja")
+    router.translate("Close", "en", "ja")
+
+    assert (first.calls, second.calls, third.calls) == (2, 0, 0)
+    assert [p.name for p in router.ranked()] == ["google", "mymemory", "deepl"]
+
+
+def test_slow_primary_is_hedged_on_the_next_provider():
+    primary, backup = StubProvider("primary", latency=0.5), StubProvider("backup")
+    router = ProviderRouter([primary, backup])
+    for _ in range(20):
+        router.health["primary"][0].record(0.01, True)
+
+    start = time.perf_counter()
+    assert router.translate("Open", "en", "ja") == "Open [ja]"
+
+    assert time.perf_counter() - start < 0.4
+    assert router.hedges == 1
+    assert router.health["backup"][0].hedge_wins == 1
+
+
+def test_failure_fails_over_to_the_next_provider():
+    bad, good = StubProvider("bad", failure_rate=1.0), StubProvider("good")
+    router = ProviderRouter([bad, good])
+
+    for _ in range(3):
+        assert router.translate("Open", "en", "ja") == "Open [ja]"
+
+    # Once measured, the healthy provider goes first
+    assert (bad.calls, good.calls) == (1, 3)
+    assert router.failovers == 1
+
+
+def test_open_circuit_skips_the_provider():
+    down = StubProvider("down", failure_rate=1.0)
+    router = ProviderRouter([down])
+    router.health["down"] = (ProviderStats(), CircuitBreaker(failure_threshold=2, cooldown=60))
+
+    for _ in range(3):
+        with pytest.raises(ProvidersUnavailable):
+            router.translate("Open", "en", "ja")
+
+    assert down.calls == 2
+    assert router.health["down"][1].state == "open"
+
+
+def test_circuit_breaker_half_opens_after_cooldown():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open" and not breaker.allows()
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open" and breaker.allows()
+    breaker.record(False)
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.trips == 1
@@ -0,0 +1,29 @@
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from scheduler import BackendScheduler, CallScope
+
+
+def test_withdraw_drops_queued_calls_of_the_scope_only():
+    scheduler = BackendScheduler(workers=1)
+    release = threading.Event()
+    ran = []
+    running = scheduler.submit("busy", lambda: release.wait(5))
+
+    scope = CallScope()
+    mine = scope.run(scheduler.submit, "mine", lambda: ran.append("mine"))
+    shared = scope.run(scheduler.submit, "shared", lambda: ran.append("shared"))
+    theirs = scheduler.submit("shared", lambda: ran.append("theirs"))
+
+    assert scheduler.withdraw(scope) == 1
+    with pytest.raises(CancelledError):
+        scope.run(scheduler.submit, "later", lambda: ran.append("later"))
+    release.set()
+    running.result(5)
+    theirs.result(5)
+
+    assert mine.cancelled()
+    assert shared is theirs
+    assert ran == ["shared"]
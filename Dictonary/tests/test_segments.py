@@ -0,0 +1,34 @@
+import pytest
+
+from segments import skip_reason, split_sentences
+
+
+@pytest.mark.parametrize("text", [
+    r"C:\Users\robot\Desktop\input.xlsx",
+    r"\\fileserver\share\report.csv",
+    "/var/log/robot.log",
+    "~/Documents/flows/",
+])
+def test_paths_are_skipped(text):
+    assert skip_reason(text, "En_to_Jp") == "path"
+
+
+@pytest.mark.parametrize("text", [
+    r"C:\Temp is where the robot saves its output",
+    "/tmp holds the intermediate files",
+    "~/flows/ contains every saved workflow",
+])
+def test_sentences_starting_with_a_path_are_translated(text):
+    assert skip_reason(text, "En_to_Jp") is None
+
+
+@pytest.mark.parametrize("text, pieces", [
+    ("Select option B. Then click OK.", ["Select option B. ", "Then click OK."]),
+    ("Answer no. The file stays open.", ["Answer no. ", "The file stays open."]),
+    ("See step No. 5 for details. Then save.", ["See step No. 5 for details. ", "Then save."]),
+    ("Use e.g. a CSV file. Then save.", ["Use e.g. a CSV file. ", "Then save."]),
+    ("Ask Dr. Sato. He knows.", ["Ask Dr. Sato. ", "He knows."]),
+    ("Made in the U.S. by us. Done.", ["Made in the U.S. by us. ", "Done."]),
+])
+def test_split_sentences_abbreviations(text, pieces):
+    assert split_sentences(text) == pieces
@@ -0,0 +1,40 @@
+import pytest
+
+from catalog import Glossary
+from providers import StubProvider, set_providers
+from memory import TranslationMemory
+from translator import JobReport, smart_translate_text, translate_segment
+
+
+@pytest.fixture
+def stub_backend():
+    provider = StubProvider(output=lambda text, source, target: f"<{text}>")
+    set_providers([provider])
+    yield provider
+    set_providers([])
+
+
+def test_empty_glossary_target_falls_back_to_backend(stub_backend):
+    glossary = Glossary({"En_to_Jp": {"ping": ""}, "Jp_to_En": {}})
+    report = JobReport()
+
+    out = smart_translate_text("Ping", glossary, "En_to_Jp", return_html=False, report=report)
+
+    assert out == "<Ping>"
+    assert report.glossary_hits == 0
+    assert stub_backend.calls == 1
+
+
+def test_dedup_counts_repeats_within_the_job_not_memory_hits(stub_backend):
+    glossary = Glossary({"En_to_Jp": {}, "Jp_to_En": {}})
+    memory = TranslationMemory()
+    translate_segment("Save the file.", glossary, "En_to_Jp", cache=memory)
+    report = JobReport()
+
+    for text in ("Save the file.", "Close it.", "Close  it."):
+        translate_segment(text, glossary, "En_to_Jp", cache=memory, report=report)
+
+    assert report.segments == 3
+    assert report.dedup_ratio == pytest.approx(1 / 3)
+    assert report.cache_hits == 2
+    assert "33% deduplicated · 2 from memory" in report.summary()
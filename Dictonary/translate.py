@@ -4,17 +4,39 @@ Developed by Mirza Muhammad Mobeen
 Refined for: Percentage-based Progress Indicators
 """
 #Libraries
-import streamlit as st
-import pandas as pd
+import functools
 import os
-import re
-import io
-import tempfile
-import openpyxl
 import time
-from deep_translator import GoogleTranslator
-from docx import Document
-from pdf2docx import Converter
+import uuid
+
+from loader import import_stage, import_timings, warm_up
+
+with import_stage("streamlit + pandas"):
+    import streamlit as st
+    import pandas as pd
+    from streamlit.logger import get_logger
+
+# Document libraries (docx, openpyxl, pdf2docx, deep_translator) load on first use
+with import_stage("app modules"):
+    from buffers import deferred_reader
+    from catalog import CatalogLibrary
+    from grid import data_grid
+    from search import TypeAhead, term_label, typeahead_input
+    from memory import TranslationMemory, entries_from_catalog, entries_from_tmx
+    from metering import get_meter, metered_job
+    from providers import get_router
+    from scheduler import BULK, INTERACTIVE, traffic
+    from segments import SKIP_RULES, join_sentences, split_sentences
+    from translator import AUTO_DIRECTION, BACKEND_MODULES, JobReport, translate_sentences
+    from documents import (
+        SUPPORTED_TYPES, BatchTranslation, JobPlan, PreviousTranslation,
+        entries_from_files, expand_uploads, file_extension, format_modules, output_name,
+        plan_document, translate_document,
+    )
+
+# Streamlit's logger setup (INFO, console handler); a plain logging logger drops INFO records
+logger = get_logger("translate")
+_run_started = time.perf_counter()
 
 # ──────────────────────────────────────────────
 # 1. PAGE CONFIG
@@ -110,6 +132,8 @@ st.markdown(
         margin-bottom: 1rem;
     }
     .cat-jp { color: #E11D48 !important; font-weight: 500; margin-left: 6px; }
+    .related-terms { margin-top: 0.8rem; font-size: 0.78rem; color: #64748B !important; }
+    .suggest-badge { margin: 0 4px 0 0; }
 
     /* ── Grid Layouts ── */
     .card-grid {
@@ -188,48 +212,35 @@ st.markdown(
 # ──────────────────────────────────────────────
 DATA_FILE = os.path.join(os.path.dirname(__file__), "Bilingual Automation Action and Activity Catalog.csv")
 
-@st.cache_data
-def load_data() -> pd.DataFrame:
-    """Loads and cleans the CSV."""
-    if not os.path.exists(DATA_FILE):
-        return pd.DataFrame() 
-
-    try:
-        df = pd.read_csv(DATA_FILE, encoding="utf-8")
-    except UnicodeDecodeError:
-        df = pd.read_csv(DATA_FILE, encoding="cp932")
-    except Exception:
-        return pd.DataFrame()
-
-    if "Category" not in df.columns:
-        if "Category (English)" in df.columns:
-            df["Category"] = df["Category (English)"]
-        elif "Category (Japanese)" in df.columns:
-            df["Category"] = df["Category (Japanese)"]
-    
-    if "Category (Japanese)" not in df.columns:
-        df["Category (Japanese)"] = ""
-
-    required_cols = [
-        "Category", "Category (Japanese)", 
-        "Action (English)", "Action (Japanese)", 
-        "Activity (English)", "Activity (Japanese)"
-    ]
-    for col in required_cols:
-        if col not in df.columns:
-            df[col] = ""
-
-    if "Source" in df.columns:
-        df = df.drop(columns=["Source"])
-        
-    df = df.drop_duplicates()
-    
-    for col in df.columns:
-        df[col] = df[col].astype(str).str.strip().replace("nan", "")
-        
-    return df
+GLOSSARY_DIR = os.path.join(os.path.dirname(__file__), "glossaries")
+
+@st.cache_resource
+def get_catalog_library() -> CatalogLibrary:
+    """Process-wide catalog + team glossaries; CSV edits are applied incrementally as they land."""
+    library = CatalogLibrary(DATA_FILE, GLOSSARY_DIR)
+    library.watch()
+    return library
 
-df = load_data()
+
+# Pin one complete catalog version for this whole rerun (stack chosen in the sidebar)
+library = get_catalog_library()
+catalog = library.snapshot(st.session_state.get("glossary_stack"))
+df = catalog.df
+facets = catalog.facets
+search_index = catalog.search_index
+
+@st.cache_resource
+def get_translation_memory() -> TranslationMemory:
+    """Sentence-level translation memory shared by all sessions and jobs, pre-seeded from the catalog."""
+    memory = TranslationMemory()
+    memory.update(entries_from_catalog(library.snapshot().glossary))
+    return memory
+
+translation_memory = get_translation_memory()
+
+# Identifies this browser session to the backend scheduler (fair queuing between users)
+if "user_id" not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
 
 if df.empty:
     st.error(f"⚠️ **Error:** Data file not found. Ensure `{os.path.basename(DATA_FILE)}` is in the directory.")
@@ -243,327 +254,106 @@ with st.sidebar:
     st.markdown('<p style="font-size:0.82rem;color:#94A3B8;margin-top:-4px;">Bilingual RPA Dictionary</p>', unsafe_allow_html=True)
     st.markdown("---")
 
-    cat_map = {} 
-    for _, row in df[["Category", "Category (Japanese)"]].drop_duplicates().iterrows():
-        en = row["Category"]
-        jp = row["Category (Japanese)"]
-        label = f"{en} ({jp})" if jp and jp != en and jp != "" else en
-        cat_map[label] = en
+    if len(library.names) > 1:
+        st.multiselect(
+            "🗂️ Glossaries",
+            options=library.names,
+            default=[library.default],
+            key="glossary_stack",
+            help="Glossaries to search and translate with. Later ones override earlier ones.",
+        )
 
-    category_labels = sorted(cat_map.keys())
     selected_labels = st.multiselect(
         "📂 Filter by Category",
-        options=category_labels,
+        options=facets.labels,
         default=[],
+        format_func=lambda lbl: f"{lbl} · {facets.count_for_label(lbl)}",
         help="Leave empty to search all categories.",
     )
-    selected_cats = [cat_map[lbl] for lbl in selected_labels]
+    selected_cats = facets.categories_for(selected_labels)
 
     st.markdown("---")
     col_s1, col_s2 = st.columns(2)
     with col_s1:
-        st.markdown(f'<div class="sidebar-stat"><div class="stat-num">{len(df)}</div><div class="stat-label">Terms</div></div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="sidebar-stat"><div class="stat-num">{facets.total_rows}</div><div class="stat-label">Terms</div></div>', unsafe_allow_html=True)
     with col_s2:
-        st.markdown(f'<div class="sidebar-stat"><div class="stat-num">{df["Category"].nunique()}</div><div class="stat-label">Cats</div></div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="sidebar-stat"><div class="stat-num">{facets.n_categories}</div><div class="stat-label">Cats</div></div>', unsafe_allow_html=True)
 
     st.markdown("---")
     view_all = st.toggle("📊 View All Data", value=False)
+    offline_mode = st.toggle(
+        "🔌 Offline mode",
+        value=False,
+        key="offline_mode",
+        help="Translate only from the glossary and the translation memory. Nothing is sent to the online providers; uncovered text is flagged and left as is.",
+    )
+    with st.expander("🛰️ Translation providers"):
+        st.dataframe(get_router().snapshot(), width="stretch", hide_index=True)
+        usage = get_meter().snapshot()
+        st.caption(f"Characters sent: {usage['total']:,} in total · {usage['by_user'].get(st.session_state.user_id, 0):,} by you today")
+    with st.expander("⏱️ Import timings"):
+        st.dataframe(import_timings(), width="stretch", hide_index=True)
     st.markdown("---")
     st.markdown('<p style="text-align:center;font-size:0.75rem;color:#CBD5E1;">Developed by<br><b>Mirza Muhammad Mobeen</b></p>', unsafe_allow_html=True)
 
 # ──────────────────────────────────────────────
-# 5. TRANSLATION LOGIC (TEXT & DOCS)
-# ──────────────────────────────────────────────
-
-def smart_translate_text(text, glossary_df, direction="En_to_Jp", return_html=True, cache=None):
-    """
-    Core translation logic with Caching support for speed.
-    """
-    if not isinstance(text, str) or not text.strip():
-        return text
-
-    # CACHE CHECK
-    if cache is not None and text in cache:
-        return cache[text]
-
-    # Setup Maps
-    if direction == "En_to_Jp":
-        src_lang, tgt_lang = 'en', 'ja'
-        action_map = dict(zip(glossary_df["Action (English)"].str.lower(), glossary_df["Action (Japanese)"]))
-        activity_map = dict(zip(glossary_df["Activity (English)"].str.lower(), glossary_df["Activity (Japanese)"]))
-    else:
-        src_lang, tgt_lang = 'ja', 'en'
-        action_map = dict(zip(glossary_df["Action (Japanese)"], glossary_df["Action (English)"]))
-        activity_map = dict(zip(glossary_df["Activity (Japanese)"], glossary_df["Activity (English)"]))
-    
-    full_map = {**action_map, **activity_map}
-
-    pattern = re.compile(r'("([^"]+)")|(\'([^\']+)\')|(「([^」]+)」)|(『([^』]+)』)')
-    placeholders = {}
-    
-    def replacer(match):
-        if match.group(2): term = match.group(2)
-        elif match.group(4): term = match.group(4)
-        elif match.group(6): term = match.group(6)
-        elif match.group(8): term = match.group(8)
-        else: return match.group(0)
-
-        lookup_key = term.lower() if direction == "En_to_Jp" else term
-        
-        if lookup_key in full_map:
-            target_term = full_map[lookup_key]
-            key = f"[ID{len(placeholders)}]" 
-            placeholders[key] = target_term
-            return key
-        else:
-            return match.group(0)
-
-    processed_text = pattern.sub(replacer, text)
-    
-    try:
-        translator = GoogleTranslator(source=src_lang, target=tgt_lang)
-        translated_text = translator.translate(processed_text)
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-    if not translated_text:
-        return text
-
-    final_text = translated_text 
-    for key, term in placeholders.items():
-        if direction == "En_to_Jp":
-            if return_html:
-                formatted_term = f"「<span class='glossary-highlight'>{term}</span>」"
-            else:
-                formatted_term = f"「{term}」"
-        else:
-            if return_html:
-                formatted_term = f""" "<span class='glossary-highlight'>{term}</span>" """
-            else:
-                formatted_term = f'"{term}"'
-        
-        escaped_key_regex = re.escape(key).replace(r"\[", r"\[\s*").replace(r"\]", r"\s*\]")
-        final_text = re.sub(escaped_key_regex, formatted_term, final_text)
-
-    # SAVE TO CACHE
-    if cache is not None:
-        cache[text] = final_text
-
-    return final_text
-
-# ──────────────────────────────────────────────
-# 6. DOCUMENT PROCESSING (WITH % STATUS)
-# ──────────────────────────────────────────────
-
-def translate_docx_file(input_file, glossary_df, direction, progress_bar=None, status_text=None):
-    doc = Document(input_file)
-    
-    # 1. Count Total Items (Paragraphs + Table Cells)
-    total_items = len(doc.paragraphs)
-    for table in doc.tables:
-        for row in table.rows:
-            total_items += len(row.cells)
-    
-    if total_items == 0: total_items = 1
-    current_item = 0
-    translation_memory = {} # Local Cache for this file
-
-    # Helper to update progress
-    def update_prog():
-        nonlocal current_item
-        current_item += 1
-        pct = int((current_item / total_items) * 100)
-        
-        if progress_bar: 
-            progress_bar.progress(min(current_item / total_items, 1.0))
-        if status_text: 
-            status_text.text(f"Processing... {pct}%")
-
-    # Translate Paragraphs
-    for para in doc.paragraphs:
-        if para.text.strip():
-            translated = smart_translate_text(para.text, glossary_df, direction, return_html=False, cache=translation_memory)
-            para.text = translated
-        update_prog()
-
-    # Translate Tables
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                # We iterate paragraphs inside cells
-                full_text = ""
-                for p in cell.paragraphs:
-                    full_text += p.text + "\n"
-                
-                if full_text.strip():
-                     # Simple approach: translate combined text and replace first paragraph
-                    translated = smart_translate_text(full_text.strip(), glossary_df, direction, return_html=False, cache=translation_memory)
-                    cell.text = translated
-                update_prog()
-    
-    output_buffer = io.BytesIO()
-    doc.save(output_buffer)
-    output_buffer.seek(0)
-    return output_buffer
-
-def convert_and_translate_pdf(input_file, glossary_df, direction, progress_bar=None, status_text=None):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tf_input:
-        tf_input.write(input_file.read())
-        temp_input_path = tf_input.name
-    temp_docx_path = temp_input_path.replace(".pdf", ".docx")
-    
-    try:
-        if status_text: status_text.text("Converting PDF to editable format...")
-        cv = Converter(temp_input_path)
-        cv.convert(temp_docx_path, start=0, end=None)
-        cv.close()
-        
-        if status_text: status_text.text("Starting Translation...")
-        with open(temp_docx_path, "rb") as f:
-            docx_buffer = translate_docx_file(f, glossary_df, direction, progress_bar, status_text)
-        return docx_buffer
-    finally:
-        if os.path.exists(temp_input_path): os.remove(temp_input_path)
-        if os.path.exists(temp_docx_path): os.remove(temp_docx_path)
-
-def translate_excel_file(input_file, glossary_df, direction, is_legacy=False, progress_bar=None, status_text=None):
-    """
-    Translates Excel with caching and percentage progress.
-    """
-    output_buffer = io.BytesIO()
-    translation_memory = {}
-
-    if is_legacy:
-        # Legacy XLS handling
-        try:
-            xls = pd.read_excel(input_file, sheet_name=None)
-            total_cells = sum(df.size for df in xls.values()) 
-            if total_cells == 0: total_cells = 1
-            current_count = 0
-            
-            with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
-                for sheet_name, df_sheet in xls.items():
-                    # Custom map function to update progress
-                    def progress_map(x):
-                        nonlocal current_count
-                        current_count += 1
-                        if current_count % 10 == 0: 
-                             pct = int((current_count / total_cells) * 100)
-                             if progress_bar: progress_bar.progress(min(current_count / total_cells, 1.0))
-                             if status_text: status_text.text(f"Processing... {pct}%")
-                        
-                        return smart_translate_text(x, glossary_df, direction, False, cache=translation_memory) if isinstance(x, str) else x
-
-                    # Translate body
-                    df_sheet = df_sheet.map(progress_map)
-                    # Translate headers
-                    df_sheet.columns = [smart_translate_text(str(c), glossary_df, direction, False, cache=translation_memory) for c in df_sheet.columns]
-                    df_sheet.to_excel(writer, sheet_name=sheet_name, index=False)
-            output_buffer.seek(0)
-            return output_buffer
-        except Exception as e:
-            return None 
-    else:
-        # Modern XLSX (OpenPyXL)
-        wb = openpyxl.load_workbook(input_file)
-        
-        # 1. Pre-calculate total non-empty string cells
-        cells_to_process = []
-        if status_text: status_text.text("Analyzing file structure...")
-        
-        for sheet in wb.worksheets:
-            for row in sheet.iter_rows():
-                for cell in row:
-                    if isinstance(cell.value, str) and cell.value.strip():
-                        cells_to_process.append(cell)
-        
-        total_cells = len(cells_to_process)
-        if total_cells == 0: total_cells = 1
-        
-        # 2. Iterate and Translate
-        for i, cell in enumerate(cells_to_process):
-            translated = smart_translate_text(cell.value, glossary_df, direction, return_html=False, cache=translation_memory)
-            cell.value = translated
-            
-            # Update Progress
-            if i % 5 == 0 or i == total_cells - 1:
-                pct = int(((i + 1) / total_cells) * 100)
-                if progress_bar: progress_bar.progress((i + 1) / total_cells)
-                if status_text: status_text.text(f"Processing... {pct}%")
-
-        wb.save(output_buffer)
-        output_buffer.seek(0)
-        return output_buffer
-
-def translate_csv_file(input_file, glossary_df, direction, progress_bar=None, status_text=None):
-    try:
-        df_csv = pd.read_csv(input_file)
-        translation_memory = {}
-        total_cells = df_csv.size
-        if total_cells == 0: total_cells = 1
-        current_count = 0
-        
-        def progress_map(x):
-            nonlocal current_count
-            current_count += 1
-            if current_count % 20 == 0:
-                 pct = int((current_count / total_cells) * 100)
-                 if progress_bar: progress_bar.progress(min(current_count / total_cells, 1.0))
-                 if status_text: status_text.text(f"Processing... {pct}%")
-            
-            return smart_translate_text(x, glossary_df, direction, False, cache=translation_memory) if isinstance(x, str) else x
-
-        df_csv = df_csv.map(progress_map)
-        df_csv.columns = [smart_translate_text(str(c), glossary_df, direction, False, cache=translation_memory) for c in df_csv.columns]
-        
-        if progress_bar: progress_bar.progress(1.0)
-        if status_text: status_text.text("Processing... 100%")
-        
-        output_buffer = io.BytesIO()
-        df_csv.to_csv(output_buffer, index=False, encoding='utf-8-sig')
-        output_buffer.seek(0)
-        return output_buffer
-    except Exception as e:
-        return None
-
-# ──────────────────────────────────────────────
-# 7. MAIN PAGE & TABS
+# 5. MAIN PAGE & TABS
 # ──────────────────────────────────────────────
 st.markdown('<p class="hero-title">SCT Automate Keywords Dictionary</p>', unsafe_allow_html=True)
 st.markdown('<p class="hero-subtitle">Bilingual Reference & Smart Translator</p>', unsafe_allow_html=True)
 
-# TABS
+def log_latency(section):
+    """Logs how long each run of a page section takes (full or fragment rerun)."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                logger.info("%s rendered in %.0f ms", section, (time.perf_counter() - started) * 1000)
+        return run
+    return wrap
+
+# TABS: each one is a fragment, so its widgets rerun only that tab. Sidebar
+# widgets stay outside the fragments because every tab depends on them.
 tab_dict, tab_trans, tab_files = st.tabs(["📖 Dictionary Search", "🤖 Smart Translator", "📄 Document Translator"])
 
 # ──────────────────────────────────────────────
 # TAB 1: DICTIONARY SEARCH
 # ──────────────────────────────────────────────
-with tab_dict:
-    query = st.text_input("search_input", placeholder="Search term (e.g., 'Excel', 'Browser')...", label_visibility="collapsed")
-    
-    filtered = df.copy()
-    if selected_cats:
-        filtered = filtered[filtered["Category"].isin(selected_cats)]
-
-    if query.strip():
-        q = query.strip().lower()
-        cols = ["Category", "Category (Japanese)", "Action (English)", "Action (Japanese)", "Activity (English)", "Activity (Japanese)"]
-        mask = pd.Series(False, index=filtered.index)
-        for col in cols:
-            mask = mask | filtered[col].str.lower().str.contains(q, na=False)
-        filtered = filtered[mask]
+@st.fragment
+@log_latency("Dictionary search")
+def dictionary_tab(selected_cats, view_all):
+    # Read the type-ahead value first so suggestions match the current query
+    if "typeahead" not in st.session_state or st.session_state.typeahead.index is not search_index:
+        st.session_state.typeahead = TypeAhead(search_index)
+    query = st.session_state.get("search_input") or ""
+
+    mask = facets.mask(selected_cats)
+    hits = st.session_state.typeahead.search(query, mask)
+    filtered = df.iloc[hits]
+    match_counts = facets.match_counts(hits)
+
+    typeahead_input("search_input", placeholder="Search term (e.g., 'Excel', 'Browser')...", suggestions=search_index.suggest(query, hits))
 
     st.markdown("---")
     
     if view_all:
-        st.dataframe(filtered, use_container_width=True, hide_index=True)
+        data_grid(catalog, hits, key="dict_grid")
     else:
         if filtered.empty:
             st.markdown('<div class="no-results"><div class="emoji">🔍</div><p>No terms found.</p></div>', unsafe_allow_html=True)
+            if query.strip():
+                closest = catalog.similarity.search(query, k=5, mask=mask)
+                if closest:
+                    badges = "".join(f'<span class="cat-badge suggest-badge">{term_label(df.iloc[r])}</span>' for r, _ in closest)
+                    st.markdown(f'<div class="related-terms">Did you mean: {badges}</div>', unsafe_allow_html=True)
         else:
-            st.markdown(f'<span class="cat-badge" style="margin-bottom:15px;">Found {len(filtered)} terms</span>', unsafe_allow_html=True)
+            st.markdown(f'<span class="cat-badge" style="margin-bottom:15px;">Found {len(filtered)} terms in {len(match_counts)} categories</span>', unsafe_allow_html=True)
             display_df = filtered.head(100)
-            for _, row in display_df.iterrows():
+            related = catalog.similarity.related(hits[:100], k=3)
+            for (_, row), similar in zip(display_df.iterrows(), related):
                 cat = row.get("Category", "")
                 cat_jp = row.get("Category (Japanese)", "")
                 en_act = row.get("Action (English)", "")
@@ -572,6 +362,7 @@ with tab_dict:
                 jp_activity = row.get("Activity (Japanese)", "")
                 
                 cat_display = f'{cat} <span class="cat-jp">({cat_jp})</span>' if cat_jp and cat_jp != cat else cat
+                related_html = f'<div class="related-terms">Related: {" / ".join(term_label(df.iloc[r]) for r, _ in similar)}</div>' if similar else ""
 
                 card_html = f"""
                 <div class="term-card">
@@ -589,14 +380,20 @@ with tab_dict:
                             <div class="activity-val">{jp_activity}</div>
                         </div>
                     </div>
+                    {related_html}
                 </div>
                 """
                 st.markdown(card_html, unsafe_allow_html=True)
 
+with tab_dict:
+    dictionary_tab(selected_cats, view_all)
+
 # ──────────────────────────────────────────────
 # TAB 2: SMART TRANSLATOR (TEXT)
 # ──────────────────────────────────────────────
-with tab_trans:
+@st.fragment
+@log_latency("Smart translator")
+def text_tab(offline_mode):
     st.markdown("""
     <div style="background:#F0F9FF;padding:15px;border-radius:10px;border:1px solid #BAE6FD;margin-bottom:20px;">
         <strong style="color:#0072B5">🤖 Smart Detection:</strong><br>
@@ -635,23 +432,67 @@ with tab_trans:
         st.subheader(tgt_label)
         
         if btn and source_text:
-            with st.spinner("Translating..."):
-                html_result = smart_translate_text(source_text, df, direction=dir_code, return_html=True)
-                plain_result = smart_translate_text(source_text, df, direction=dir_code, return_html=False)
-            
-            st.markdown(f'<div class="result-box">{html_result}</div>', unsafe_allow_html=True)
+            sentences = split_sentences(source_text)
+            html_parts = [None] * len(sentences)
+            plain_parts = [None] * len(sentences)
+            pending_html = '<span style="color:#94A3B8;">…</span>'
+            missed = 0
+
+            result_box = st.empty()
+            cancel_slot = st.empty()
+            # A click reruns the script, which stops this loop and cancels what is queued
+            cancel_slot.button("⏹ Cancel", key="cancel_text_translation")
+
+            stream = translate_sentences(sentences, catalog.glossary, dir_code, cache=translation_memory, offline=offline_mode)
+            # Text requests jump ahead of document jobs in the backend queue
+            with traffic(st.session_state.user_id, INTERACTIVE):
+                try:
+                    for i, html, plain, was_missed in stream:
+                        html_parts[i], plain_parts[i] = html, plain
+                        missed += was_missed
+                        shown = [p if p is not None else pending_html for p in html_parts]
+                        result_box.markdown(f'<div class="result-box">{join_sentences(shown, dir_code)}</div>', unsafe_allow_html=True)
+                finally:
+                    stream.close()
+            cancel_slot.empty()
+
+            if missed:
+                st.warning(f"⚠️ {missed} sentence(s) could not be translated (offline mode or no provider available) and were left as is.")
             st.caption("📋 Copy raw text:")
-            st.code(plain_result, language=None)
+            st.code(join_sentences(plain_parts, dir_code), language=None)
             
         elif not source_text and btn:
             st.warning("Please enter text to translate.")
         else:
             st.markdown('<div class="result-box" style="color:#94A3B8;display:flex;align-items:center;justify-content:center;">Translation will appear here...</div>', unsafe_allow_html=True)
 
+with tab_trans:
+    text_tab(offline_mode)
+
 # ──────────────────────────────────────────────
 # TAB 3: DOCUMENT TRANSLATOR
 # ──────────────────────────────────────────────
-with tab_files:
+def admit_job(plan: JobPlan, offline_mode) -> bool:
+    """Shows a job's dry-run plan; False if its character budget doesn't let it run now."""
+    st.caption(f"🧮 Plan: {plan.summary(get_router().expected_latency())}")
+    if offline_mode or not plan.billable_chars:
+        return True
+    decision = get_meter().decide(plan.billable_chars, st.session_state.user_id)
+    if decision.action == "reject":
+        st.error(f"⛔ Job rejected: it {decision.reason}. Split the upload, or use offline mode to translate from the glossary and memory only.")
+    elif decision.action == "defer":
+        st.warning(f"⏳ Job not started: it {decision.reason}. It isn't queued, so start it again then, "
+                   "or switch on offline mode to translate it from the glossary and memory now.")
+    return decision.allowed
+
+
+def new_job_id(name) -> str:
+    return f"{st.session_state.user_id[:8]}/{name}/{uuid.uuid4().hex[:6]}"
+
+
+@st.fragment
+@log_latency("Document translator")
+def documents_tab(offline_mode):
     st.markdown("""
     <div style="background:#FDF2F8;padding:15px;border-radius:10px;border:1px solid #FCC2D7;margin-bottom:20px;">
         <strong style="color:#BE185D">📄 File Translator (Beta)):</strong><br>
@@ -663,62 +504,115 @@ with tab_files:
 
     file_dir_mode = st.radio(
         "Translation Direction (File):",
-        ["🇺🇸 English ➝ 🇯🇵 Japanese", "🇯🇵 Japanese ➝ 🇺🇸 English"],
+        ["🇺🇸 English ➝ 🇯🇵 Japanese", "🇯🇵 Japanese ➝ 🇺🇸 English", "🔀 Auto-detect per segment"],
         horizontal=True,
         key="file_dir"
     )
     
-    f_dir_code = "En_to_Jp" if "English" in file_dir_mode.split("➝")[0] else "Jp_to_En"
+    if "Auto" in file_dir_mode:
+        f_dir_code = AUTO_DIRECTION
+    else:
+        f_dir_code = "En_to_Jp" if "English" in file_dir_mode.split("➝")[0] else "Jp_to_En"
 
-    uploaded_file = st.file_uploader("Upload your document", type=["docx", "pdf", "xlsx", "xls", "csv"])
+    skip_labels = {
+        "formula": "Formulas", "url": "URLs", "email": "Emails", "path": "File paths",
+        "date": "Dates & times", "number": "Numbers", "code": "IDs / codes",
+        "target_script": "Text already in target language",
+    }
+    skip_rules = st.multiselect(
+        "Pass through untouched:",
+        options=list(SKIP_RULES),
+        default=list(SKIP_RULES),
+        format_func=skip_labels.get,
+        key="skip_rules",
+    )
 
-    if uploaded_file is not None:
-        file_ext = uploaded_file.name.split(".")[-1].lower()
+    verify_terms = st.toggle(
+        "✔️ Check glossary terms after translation",
+        value=True,
+        key="verify_terms",
+        help="Verifies that multi-word dictionary terms, quoted terms and cells made only of terms came out as their "
+             "official translation. Single common words in running text (\"open\", \"file\") aren't checked.",
+    )
+
+    uploaded_files = st.file_uploader(
+        "Upload your document(s)",
+        type=SUPPORTED_TYPES + ["zip"],
+        accept_multiple_files=True,
+        help="Several files or a ZIP archive are translated in parallel and returned as one ZIP.",
+    )
+    is_batch = len(uploaded_files) > 1 or any(file_extension(f.name) == "zip" for f in uploaded_files)
+
+    if uploaded_files and not is_batch:
+        uploaded_file = uploaded_files[0]
+        file_ext = file_extension(uploaded_file.name)
         st.info(f"File detected: {uploaded_file.name}")
+
+        # ── UPDATE MODE: reuse a previous source/translation pair ──
+        prev_source = prev_translated = None
+        update_mode = st.toggle(
+            "🔁 Update an existing translation",
+            value=False,
+            disabled=file_ext == "pdf",
+            help="Only new or changed paragraphs/cells are translated; the rest (including manual edits) is copied from the previous translation.",
+        )
+        if update_mode:
+            col_p1, col_p2 = st.columns(2)
+            with col_p1:
+                prev_source = st.file_uploader("Previous source version", type=[file_ext], key="prev_source")
+            with col_p2:
+                prev_type = "xlsx" if file_ext == "xls" else file_ext
+                prev_translated = st.file_uploader("Previous translation", type=[prev_type], key="prev_translated")
         
-        if st.button("Start Translation", type="primary"):
+        col_start, col_plan = st.columns(2)
+        start = col_start.button("Start Translation", type="primary")
+        if col_plan.button("🧮 Dry run (estimate cost)") or start:
+            plan = plan_document(uploaded_file.name, uploaded_file, catalog.glossary, f_dir_code, skip_rules, translation_memory)
+            start = admit_job(plan, offline_mode) and start
+
+        if start:
             
             # ── PROGRESS BAR SETUP ──
             progress_bar = st.progress(0)
             status_text = st.empty()
+            report = JobReport()
             
             try:
-                output_data = None
-                out_name = f"Translated_{uploaded_file.name}"
-                mime_type = "application/octet-stream"
-                
-                # Logic Branching
-                if file_ext == "docx":
-                    output_data = translate_docx_file(uploaded_file, df, f_dir_code, progress_bar, status_text)
-                    mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                
-                elif file_ext == "pdf":
-                    output_data = convert_and_translate_pdf(uploaded_file, df, f_dir_code, progress_bar, status_text)
-                    out_name = out_name.replace(".pdf", ".docx")
-                    mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                
-                elif file_ext == "xlsx":
-                    output_data = translate_excel_file(uploaded_file, df, f_dir_code, is_legacy=False, progress_bar=progress_bar, status_text=status_text)
-                    mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-
-                elif file_ext == "xls":
-                    output_data = translate_excel_file(uploaded_file, df, f_dir_code, is_legacy=True, progress_bar=progress_bar, status_text=status_text)
-                    out_name = out_name.replace(".xls", ".xlsx")
-                    mime_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                
-                elif file_ext == "csv":
-                    output_data = translate_csv_file(uploaded_file, df, f_dir_code, progress_bar, status_text)
-                    mime_type = "text/csv"
+                previous = None
+                if update_mode and prev_source is not None and prev_translated is not None:
+                    status_text.text("Aligning with the previous version...")
+                    previous = PreviousTranslation.from_files(file_ext, prev_source, prev_translated)
+
+                out_name, mime_type = output_name(uploaded_file.name)
+                job_id = new_job_id(uploaded_file.name)
+                with traffic(st.session_state.user_id, BULK), metered_job(job_id):
+                    output_data = translate_document(uploaded_file.name, uploaded_file, catalog.glossary, f_dir_code, progress_bar, status_text, report, skip_rules, translation_memory, previous, offline_mode, verify_terms)
+                logger.info("Job %s sent %d characters", job_id, get_meter().job_chars(job_id))
                 
                 # Finalize
                 if output_data:
                     progress_bar.progress(100)
                     status_text.success("✅ Translation Complete!")
+                    st.caption(f"📊 {report.summary()} · {get_meter().job_chars(job_id):,} characters sent")
+                    if report.consistency is not None and report.consistency.misses:
+                        checked = report.consistency
+                        with st.expander(f"🔎 {len(checked.misses)} glossary term(s) not rendered officially"):
+                            if checked.inconsistent:
+                                st.caption("Inconsistent: " + ", ".join(checked.inconsistent))
+                            st.dataframe(
+                                pd.DataFrame(checked.misses, columns=["Term", "Official translation", "Source", "Translation"]),
+                                width="stretch",
+                                hide_index=True,
+                            )
+                    if report.untranslated:
+                        with st.expander(f"⚠️ {len(report.untranslated)} sentence(s) left untranslated"):
+                            st.dataframe({"Source": report.untranslated}, width="stretch", hide_index=True)
                     st.download_button(
                         label="📥 Download Translated Document",
-                        data=output_data,
+                        data=deferred_reader(output_data),
                         file_name=out_name,
-                        mime=mime_type
+                        mime=mime_type,
+                        on_click="ignore",
                     )
                 else:
                     status_text.error("Failed to generate output data.")
@@ -726,10 +620,128 @@ with tab_files:
             except Exception as e:
                 status_text.error(f"Error processing file: {str(e)}")
 
+    elif uploaded_files:
+        # ── BATCH MODE: many files / ZIP archives → one ZIP ──
+        try:
+            batch_items = expand_uploads(uploaded_files)
+        except Exception as e:
+            batch_items = []
+            st.error(f"Could not read the upload: {str(e)}")
+        st.info(f"{len(batch_items)} document(s) detected")
+        if st.session_state.pop("batch_cancelled", False):
+            st.warning("Batch translation cancelled.")
+
+        start = False
+        if batch_items:
+            col_start, col_plan = st.columns(2)
+            start = col_start.button("Start Batch Translation", type="primary")
+            if col_plan.button("🧮 Dry run (estimate cost)", key="batch_dry_run") or start:
+                plan = JobPlan()
+                for name, item in batch_items:
+                    plan.merge(plan_document(name, item, catalog.glossary, f_dir_code, skip_rules, translation_memory))
+                start = admit_job(plan, offline_mode) and start
+
+        if start:
+            overall_bar = st.progress(0, text="Overall progress")
+            file_rows = []
+            for name, _ in batch_items:
+                col_name, col_bar = st.columns([2, 3])
+                col_name.caption(name)
+                file_rows.append((col_bar.progress(0), col_bar.empty()))
+
+            job_id = new_job_id(f"batch of {len(batch_items)}")
+            # Workers inherit the traffic and metering tags from here
+            with traffic(st.session_state.user_id, BULK), metered_job(job_id):
+                batch = BatchTranslation(batch_items, catalog.glossary, f_dir_code, skip_rules, translation_memory, offline=offline_mode, verify=verify_terms)
+
+            def cancel_batch():
+                # Runs at the start of the rerun the click triggers, which also ends the polling below
+                if not batch.done():
+                    batch.cancel()
+                    st.session_state.batch_cancelled = True
+
+            cancel_slot = st.empty()
+            cancel_slot.button("⏹ Cancel batch", key="batch_cancel", on_click=cancel_batch)
+
+            def render_batch():
+                overall_bar.progress(min(batch.overall, 1.0), text=f"Overall progress: {int(batch.overall * 100)}%")
+                for (bar, label), (fraction, message) in zip(file_rows, batch.progress):
+                    bar.progress(min(fraction, 1.0))
+                    label.text(message)
+
+            # Workers can't touch the page; poll their progress from this thread
+            while not batch.done():
+                render_batch()
+                time.sleep(0.3)
+            cancel_slot.empty()
+            archive = batch.finish()
+            render_batch()
+            logger.info("Job %s sent %d characters", job_id, get_meter().job_chars(job_id))
+
+            done = len(batch_items) - len(batch.errors)
+            if done:
+                st.success(f"✅ Translated {done} of {len(batch_items)} document(s)")
+                st.caption(f"📊 {batch.summary().summary()} · {get_meter().job_chars(job_id):,} characters sent")
+                st.download_button(
+                    label="📥 Download Translated Documents (ZIP)",
+                    data=deferred_reader(archive),
+                    file_name="Translated_documents.zip",
+                    mime="application/zip",
+                    on_click="ignore",
+                )
+            else:
+                st.error("Failed to generate output data.")
+
+    # ── TRANSLATION MEMORY IMPORT ──
+    st.markdown("---")
+    memory_size = f"{len(translation_memory):,}" + (f" / {translation_memory.max_entries:,}" if translation_memory.max_entries else "")
+    with st.expander(f"🧠 Translation memory · {memory_size} sentences · {translation_memory.hit_ratio:.0%} hit rate"):
+        st.caption("Seed the shared memory with existing translations (TMX files or source/translation pairs) so new jobs reuse them. "
+                   "When it is full, the least recently used sentences are dropped "
+                   f"({translation_memory.evictions:,} so far; limit set by DICTIONARY_MEMORY_MAX_ENTRIES).")
+        tmx_files = st.file_uploader("TMX files", type=["tmx"], accept_multiple_files=True, key="tm_tmx")
+        col_m1, col_m2 = st.columns(2)
+        with col_m1:
+            tm_source = st.file_uploader("Source document", type=["docx", "xlsx"], key="tm_source")
+        with col_m2:
+            tm_target = st.file_uploader("Its translation", type=["docx", "xlsx"], key="tm_target")
+
+        if st.button("Import into memory"):
+            added = 0
+            try:
+                for tmx in tmx_files:
+                    added += translation_memory.update(entries_from_tmx(tmx))
+                if tm_source is not None and tm_target is not None:
+                    pair_ext = file_extension(tm_source.name)
+                    pair_dir = f_dir_code if f_dir_code != AUTO_DIRECTION else None
+                    added += translation_memory.update(entries_from_files(pair_ext, tm_source, tm_target, pair_dir))
+                st.success(f"✅ Added {added:,} sentences to the translation memory")
+            except Exception as e:
+                st.error(f"Could not import: {str(e)}")
+
+with tab_files:
+    documents_tab(offline_mode)
+
 # ──────────────────────────────────────────────
-# 8.FOOTER
+# 6.FOOTER
 # ──────────────────────────────────────────────
 st.markdown(
     '<div class="custom-footer">© 2026 | Developed by <span>Mirza Muhammad Mobeen</span></div>',
     unsafe_allow_html=True,
 )
+
+# ──────────────────────────────────────────────
+# 7. BACKGROUND WARM-UP
+# ──────────────────────────────────────────────
+# Set DICTIONARY_WARM_UP=0 to load the document stack only when a file is translated
+WARM_UP = os.environ.get("DICTIONARY_WARM_UP", "1") != "0"
+
+@st.cache_resource
+def start_warm_up():
+    """Once per process, after the first page has rendered: preload the document stack."""
+    return warm_up(format_modules() + BACKEND_MODULES)
+
+if WARM_UP:
+    start_warm_up()
+
+logger.info("Full page run took %.0f ms", (time.perf_counter() - _run_started) * 1000)
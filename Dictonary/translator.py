@@ -0,0 +1,310 @@
+"""
+Translation engine: glossary-aware segment translation shared by the text and document tools.
+Developed by Mirza Muhammad Mobeen
+"""
+
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from catalog import as_glossary
+from consistency import ConsistencyReport
+from memory import MemoryPeek, TranslationMemory
+from providers import ProvidersUnavailable, get_router
+from scheduler import CallScope, get_scheduler, run_in_context
+from segments import (
+    QUOTED_TERM, SKIP_RULES, detect_direction, join_sentences, normalize_text,
+    restore_affixes, skip_reason, split_affixes, split_sentences,
+)
+
+
+# ──────────────────────────────────────────────
+# GLOSSARY-AWARE TRANSLATION
+# ──────────────────────────────────────────────
+BACKEND_MODULES = ["deep_translator"]
+
+
+class OfflineMiss(Exception):
+    """Raised in offline mode for text that neither the glossary nor the translation memory covers."""
+
+
+class BackendUnavailable(OfflineMiss):
+    """Raised when no provider could translate the text; it's left as is, like an offline miss."""
+
+
+def smart_translate_text(text, glossary, direction="En_to_Jp", return_html=True, cache=None, report=None, offline=False):
+    """
+    Core translation logic. `cache` (a TranslationMemory or dict) stores backend
+    results keyed by (direction, text with glossary placeholders), so the same
+    entry serves both HTML and plain output and survives glossary switches.
+    Text made only of glossary terms is resolved locally; with `offline=True`
+    the backend is never called and anything else raises OfflineMiss. Backend
+    calls go through the provider router; if every provider fails,
+    BackendUnavailable is raised instead of returning an error string.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return text
+
+    glossary = as_glossary(glossary)
+    local = glossary.resolve(text, direction)
+    if local:
+        if report is not None:
+            report.glossary_hits += 1
+        return f"<span class='glossary-highlight'>{local}</span>" if return_html else local
+
+    # Setup Maps
+    if direction == "En_to_Jp":
+        src_lang, tgt_lang = 'en', 'ja'
+    else:
+        src_lang, tgt_lang = 'ja', 'en'
+    full_map = glossary.lookup_map(direction)
+
+    placeholders = {}
+    
+    def replacer(match):
+        term = next(group for group in match.groups() if group)
+        lookup_key = term.lower() if direction == "En_to_Jp" else term
+        
+        if lookup_key in full_map:
+            target_term = full_map[lookup_key]
+            key = f"[ID{len(placeholders)}]" 
+            placeholders[key] = target_term
+            return key
+        else:
+            return match.group(0)
+
+    processed_text = QUOTED_TERM.sub(replacer, text)
+
+    # CACHE CHECK
+    memory_key = (direction, processed_text)
+    translated_text = cache.get(memory_key) if cache is not None else None
+    if translated_text is not None:
+        if report is not None:
+            report.cache_hits += 1
+    elif offline:
+        raise OfflineMiss(text)
+    else:
+        if report is not None:
+            report.unique += 1
+        def backend_call():
+            # Fastest healthy provider, hedged and failed over by the router
+            return get_router().translate(processed_text, src_lang, tgt_lang)
+
+        try:
+            # Queued with every other session's requests; identical ones share a call
+            translated_text = get_scheduler().call(memory_key, backend_call)
+        except ProvidersUnavailable as e:
+            raise BackendUnavailable(text) from e
+        # SAVE TO CACHE
+        if cache is not None and translated_text:
+            cache[memory_key] = translated_text
+
+    if not translated_text:
+        return text
+
+    final_text = translated_text 
+    for key, term in placeholders.items():
+        if direction == "En_to_Jp":
+            if return_html:
+                formatted_term = f"「<span class='glossary-highlight'>{term}</span>」"
+            else:
+                formatted_term = f"「{term}」"
+        else:
+            if return_html:
+                formatted_term = f""" "<span class='glossary-highlight'>{term}</span>" """
+            else:
+                formatted_term = f'"{term}"'
+        
+        escaped_key_regex = re.escape(key).replace(r"\[", r"\[\s*").replace(r"\]", r"\s*\]")
+        final_text = re.sub(escaped_key_regex, formatted_term, final_text)
+
+    return final_text
+
+
+# ──────────────────────────────────────────────
+# NORMALIZED / DEDUPLICATED SEGMENTS
+# ──────────────────────────────────────────────
+# Pass as `direction` to let each segment pick its own
+AUTO_DIRECTION = "Auto"
+
+DIRECTION_LABELS = {"En_to_Jp": "En→Jp", "Jp_to_En": "Jp→En"}
+
+
+class JobReport:
+    """Counters for one translation job, shown to the user when it finishes."""
+
+    def __init__(self):
+        self.segments = 0      # non-empty sentences seen
+        self.distinct = set()  # (direction, canonical sentence) of those sentences
+        self.unique = 0        # sentences actually sent for translation
+        self.cache_hits = 0    # sentences served from the translation memory
+        self.skipped = Counter()  # segments passed through untouched, by rule
+        self.directions = Counter()  # translated cells/paragraphs per direction
+        self.reused = 0        # cells/paragraphs carried over from a previous translation
+        self.peak_memory = 0   # bytes above the job's starting level (0 = not measured)
+        self.glossary_hits = 0  # sentences resolved from the glossary alone
+        self.untranslated = []  # offline mode: sentences left in the source language
+        self.consistency = None  # ConsistencyReport when the output was verified
+
+    def merge(self, other: "JobReport"):
+        """Adds another job's counters (batch totals)."""
+        self.segments += other.segments
+        self.distinct |= other.distinct
+        self.unique += other.unique
+        self.cache_hits += other.cache_hits
+        self.reused += other.reused
+        self.skipped.update(other.skipped)
+        self.directions.update(other.directions)
+        self.peak_memory = max(self.peak_memory, other.peak_memory)
+        self.glossary_hits += other.glossary_hits
+        self.untranslated += other.untranslated
+        if other.consistency is not None:
+            if self.consistency is None:
+                self.consistency = ConsistencyReport()
+            self.consistency.merge(other.consistency)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Share of sentences that repeat an earlier one of the same job."""
+        return (self.segments - len(self.distinct)) / self.segments if self.segments else 0.0
+
+    def summary(self) -> str:
+        text = (
+            f"{self.segments} sentences · {self.unique} translated · "
+            f"{self.dedup_ratio:.0%} deduplicated · {self.cache_hits} from memory"
+        )
+        if self.directions:
+            text += " · " + ", ".join(f"{n} {DIRECTION_LABELS[d]}" for d, n in self.directions.most_common())
+        if self.glossary_hits:
+            text += f" · {self.glossary_hits} from glossary"
+        if self.reused:
+            text += f" · {self.reused} reused from previous version"
+        if self.untranslated:
+            text += f" · ⚠️ {len(self.untranslated)} left untranslated (offline or no provider available)"
+        if self.skipped:
+            details = ", ".join(f"{n} {rule}" for rule, n in self.skipped.most_common())
+            text += f" · {sum(self.skipped.values())} passed through ({details})"
+        if self.peak_memory:
+            text += f" · peak memory {self.peak_memory / 2**20:.1f} MB"
+        if self.consistency is not None:
+            text += f" · {self.consistency.summary()}"
+        return text
+
+
+def translate_segment(text, glossary, direction, cache=None, report=None, skip_rules=SKIP_RULES, offline=False):
+    """
+    Document-pipeline entry point. Passes through segments matched by
+    `skip_rules` (numbers, IDs, URLs, text already in the target language...),
+    then translates sentence by sentence: each sentence is width/whitespace
+    folded, its surrounding whitespace and punctuation set aside, looked up in
+    the translation memory `cache`, and reassembled. With
+    `direction=AUTO_DIRECTION` the direction is detected per segment. In
+    `offline` mode, sentences without a glossary or memory hit stay as they
+    are and are listed in `report.untranslated` (as are sentences no provider
+    could translate).
+    """
+    if not isinstance(text, str) or not text.strip():
+        return text
+
+    reason = skip_reason(text, direction, skip_rules)
+    if not reason and direction == AUTO_DIRECTION:
+        direction = detect_direction(text)
+        if direction is None:
+            reason = "no_letters"
+    if reason:
+        if report is not None:
+            report.skipped[reason] += 1
+        return text
+
+    if report is not None:
+        report.directions[direction] += 1
+
+    pieces = []
+    for sentence in split_sentences(text):
+        lead, core, trail = split_affixes(sentence)
+        if not core:
+            pieces.append(sentence)
+            continue
+        core = normalize_text(core)
+        if report is not None:
+            report.segments += 1
+            report.distinct.add((direction, core))
+        try:
+            translated = smart_translate_text(core, glossary, direction, return_html=False, cache=cache, report=report, offline=offline)
+        except OfflineMiss:
+            if report is not None:
+                report.untranslated.append(core)
+            pieces.append(sentence)
+            continue
+        pieces.append(restore_affixes(lead, translated, trail, direction))
+
+    return join_sentences(pieces, direction)
+
+
+# ──────────────────────────────────────────────
+# STREAMING TEXT TRANSLATION
+# ──────────────────────────────────────────────
+# Sentences of one text translated at once (the scheduler still limits backend calls)
+TEXT_WORKERS = 4
+
+
+def _peek(cache):
+    return MemoryPeek(cache) if isinstance(cache, TranslationMemory) else cache
+
+
+def _translate_sentence(sentence, glossary, direction, cache, offline, report=None):
+    """(html, plain) for one sentence, keeping its surrounding whitespace/punctuation."""
+    lead, core, trail = split_affixes(sentence)
+    if not core:
+        return sentence, sentence
+    html = smart_translate_text(core, glossary, direction, return_html=True, cache=cache, report=report, offline=offline)
+    # Served from the memory (or glossary) filled by the call above, without counting a second lookup
+    plain = smart_translate_text(core, glossary, direction, return_html=False, cache=_peek(cache), offline=offline)
+    return restore_affixes(lead, html, trail, direction), restore_affixes(lead, plain, trail, direction)
+
+
+def translate_sentences(sentences, glossary, direction, cache=None, offline=False, max_workers=TEXT_WORKERS):
+    """
+    Yields (index, html, plain, missed) as the sentences of a text finish.
+    Glossary and memory hits are yielded right away; the rest go to a thread
+    pool. Closing the generator cancels every sentence not yet started and
+    withdraws its queued backend calls from the scheduler.
+    `missed` marks sentences left untranslated (offline mode or no provider available).
+    """
+    glossary = as_glossary(glossary)
+    # The first pass only looks: sentences it can't serve are looked up (and counted) once below
+    peek = _peek(cache)
+    pending = []
+    for i, sentence in enumerate(sentences):
+        probe = JobReport()
+        try:
+            html, plain = _translate_sentence(sentence, glossary, direction, peek, offline=True, report=probe)
+        except OfflineMiss:
+            if offline:
+                if isinstance(cache, TranslationMemory):
+                    cache.record(misses=1)
+                yield i, sentence, sentence, True
+            else:
+                pending.append(i)
+            continue
+        if probe.cache_hits and isinstance(cache, TranslationMemory):
+            cache.record(hits=1)
+        yield i, html, plain, False
+    if not pending:
+        return
+
+    scope = CallScope()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="text")
+    try:
+        futures = {run_in_context(executor, scope.run, _translate_sentence, sentences[i], glossary, direction, cache, False): i for i in pending}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                html, plain = future.result()
+            except BackendUnavailable:
+                yield i, sentences[i], sentences[i], True
+                continue
+            yield i, html, plain, False
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        get_scheduler().withdraw(scope)